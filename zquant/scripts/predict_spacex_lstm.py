@@ -223,6 +223,8 @@ class LSTMModel(nn.Module):
             batch_first=True,
             dropout=dropout if num_layers > 1 else 0.0,
         )
+        # 权重放入连续内存块，cuDNN 可直接调用融合的 RNN kernel
+        self.lstm.flatten_parameters()
         # 输出horizon * 3 (每天3个价格: high, low, close)
         self.head = nn.Linear(hidden_size, horizon * 3)
         self.horizon = horizon
@@ -264,17 +266,20 @@ def load_model(model_path: Path) -> dict:
     # 提取标准化参数
     feat_mean = state["feat_mean"]
     feat_std = state["feat_std"]
-    # y_mean和y_std现在是字典格式
+    # y_mean和y_std现在是形状 (3,) 的数组，顺序为 high、low、close
     y_mean = state["y_mean"]
     y_std = state["y_std"]
     
-    # 兼容旧格式（如果y_mean/y_std不是字典）
-    if not isinstance(y_mean, dict):
+    # 兼容旧格式：字典 {"high", "low", "close"} 或单一值
+    if isinstance(y_mean, dict):
+        y_mean = [y_mean["high"], y_mean["low"], y_mean["close"]]
+        y_std = [y_std["high"], y_std["low"], y_std["close"]]
+    elif np.ndim(y_mean) == 0:
         logger.warning("检测到旧格式的标准化参数，将转换为新格式")
-        # 假设旧格式是单一值，需要转换为字典格式
-        # 这里需要根据实际情况处理，暂时使用close的值
-        y_mean = {"high": y_mean, "low": y_mean, "close": y_mean}
-        y_std = {"high": y_std, "low": y_std, "close": y_std}
+        y_mean = [y_mean] * 3
+        y_std = [y_std] * 3
+    y_mean = np.asarray(y_mean, dtype=np.float32)
+    y_std = np.asarray(y_std, dtype=np.float32)
     
     # 提取模型评估指标
     confidence = state.get("confidence", 0.0)
@@ -475,11 +480,12 @@ def predict_single(
         X_norm = np.nan_to_num(X_norm, nan=0.0, posinf=1e6, neginf=-1e6)
     
     # 转换为 Tensor
-    X_tensor = torch.tensor(X_norm, dtype=torch.float32).to(device)
+    X_tensor = torch.from_numpy(np.ascontiguousarray(X_norm, dtype=np.float32)).to(device)
     
-    # 模型预测
-    model.eval()
-    with torch.no_grad():
+    # 模型预测（load_model 已切换到推理模式，仅在调用方改回训练模式时切换）
+    if model.training:
+        model.eval()
+    with torch.inference_mode():
         pred_norm = model(X_tensor).cpu().numpy()
     
     # 检查预测结果
@@ -487,13 +493,8 @@ def predict_single(
         logger.warning("模型输出包含无效值，已清理")
         pred_norm = np.nan_to_num(pred_norm, nan=0.0, posinf=1e6, neginf=-1e6)
     
-    # 反标准化: 分别对H、L、C进行反标准化
-    y_mean = model_config["y_mean"]
-    y_std = model_config["y_std"]
-    pred = np.zeros_like(pred_norm, dtype=np.float32)
-    pred[:, :, 0] = pred_norm[:, :, 0] * y_std["high"] + y_mean["high"]
-    pred[:, :, 1] = pred_norm[:, :, 1] * y_std["low"] + y_mean["low"]
-    pred[:, :, 2] = pred_norm[:, :, 2] * y_std["close"] + y_mean["close"]
+    # 反标准化: H、L、C 的均值/标准差按最后一维广播
+    pred = (pred_norm * model_config["y_std"] + model_config["y_mean"]).astype(np.float32, copy=False)
     
     return pred[0]  # 返回 (horizon, 3) 形状的数组
 
@@ -545,13 +546,15 @@ def predict(
         base_date = df['trade_date'].max()
         future_dates = df[df["trade_date"] > base_date]["trade_date"].sort_values().head(horizon).tolist()
         
-        print("\n" + "=" * 100)
-        print(f"股票预测结果: {ts_code}")
-        print(f"预测基准日: {base_date.strftime('%Y-%m-%d')}")
-        print(f"基准收盘价: {base_close:.2f}")
-        print("-" * 100)
-        print(f"{'预测日期':<12} | {'预测最高价':<15} | {'预测最低价':<15} | {'预测收盘价':<15} | {'收盘涨跌幅':<15}")
-        print("-" * 100)
+        lines = []
+        emit = lines.append
+        emit("\n" + "=" * 100)
+        emit(f"股票预测结果: {ts_code}")
+        emit(f"预测基准日: {base_date.strftime('%Y-%m-%d')}")
+        emit(f"基准收盘价: {base_close:.2f}")
+        emit("-" * 100)
+        emit(f"{'预测日期':<12} | {'预测最高价':<15} | {'预测最低价':<15} | {'预测收盘价':<15} | {'收盘涨跌幅':<15}")
+        emit("-" * 100)
         for i in range(len(pred_prices)):
             pred_high = pred_prices[i, 0]
             pred_low = pred_prices[i, 1]
@@ -561,8 +564,10 @@ def predict(
                 date_str = future_dates[i].strftime("%Y-%m-%d")
             else:
                 date_str = f"T+{i+1}"
-            print(f"{date_str:<12} | {pred_high:>13.2f} | {pred_low:>13.2f} | {pred_close:>13.2f} | {pct:>+13.2f}%")
-        print("=" * 100)
+            emit(f"{date_str:<12} | {pred_high:>13.2f} | {pred_low:>13.2f} | {pred_close:>13.2f} | {pct:>+13.2f}%")
+        emit("=" * 100)
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
         return
     
     num_to_eval = min(len(eval_rows), eval_days)
@@ -831,32 +836,34 @@ def predict(
             "mdd": mdd_actual,
         }
     
-    # 打印报告
-    print("\n" + "=" * 125)
-    print(f"股票 {eval_days} 日循环评估报告: {ts_code}")
-    print(f"评估周期: {eval_stats[0]['date'].strftime('%Y-%m-%d')} 至 {eval_stats[-1]['date'].strftime('%Y-%m-%d')} ({num_to_eval} 交易日)")
-    print("-" * 125)
+    # 打印报告 (先缓冲再一次性输出)
+    lines = []
+    emit = lines.append
+    emit("\n" + "=" * 125)
+    emit(f"股票 {eval_days} 日循环评估报告: {ts_code}")
+    emit(f"评估周期: {eval_stats[0]['date'].strftime('%Y-%m-%d')} 至 {eval_stats[-1]['date'].strftime('%Y-%m-%d')} ({num_to_eval} 交易日)")
+    emit("-" * 125)
     
     if summary_metrics:
-        print(f"【汇总评估 (基于前 {summary_metrics['count']} 个已实现 T+1 交易日)】")
-        print(f"  - 预测胜率 (Win Rate, 基于收盘价): {summary_metrics['win_rate']*100:.2f}%")
-        print(f"  - 平均绝对误差 (MAE):")
-        print(f"    High: {summary_metrics['mae_high']:.4f}, Low: {summary_metrics['mae_low']:.4f}, Close: {summary_metrics['mae_close']:.4f}, 平均: {summary_metrics['mae']:.4f}")
-        print(f"  - 均方根误差 (RMSE):")
-        print(f"    High: {summary_metrics['rmse_high']:.4f}, Low: {summary_metrics['rmse_low']:.4f}, Close: {summary_metrics['rmse_close']:.4f}, 平均: {summary_metrics['rmse']:.4f}")
-        print(f"  - 累计收益率 (Total Return): {summary_metrics['total_return']*100:+.2f}%")
-        print(f"  - 年化收益率 (Annualized Return): {summary_metrics['annualized_return']*100:+.2f}%")
-        print(f"  - 实际最大回撤 (Actual MDD): {summary_metrics['mdd']*100:.2f}%")
-        print("-" * 125)
+        emit(f"【汇总评估 (基于前 {summary_metrics['count']} 个已实现 T+1 交易日)】")
+        emit(f"  - 预测胜率 (Win Rate, 基于收盘价): {summary_metrics['win_rate']*100:.2f}%")
+        emit(f"  - 平均绝对误差 (MAE):")
+        emit(f"    High: {summary_metrics['mae_high']:.4f}, Low: {summary_metrics['mae_low']:.4f}, Close: {summary_metrics['mae_close']:.4f}, 平均: {summary_metrics['mae']:.4f}")
+        emit(f"  - 均方根误差 (RMSE):")
+        emit(f"    High: {summary_metrics['rmse_high']:.4f}, Low: {summary_metrics['rmse_low']:.4f}, Close: {summary_metrics['rmse_close']:.4f}, 平均: {summary_metrics['rmse']:.4f}")
+        emit(f"  - 累计收益率 (Total Return): {summary_metrics['total_return']*100:+.2f}%")
+        emit(f"  - 年化收益率 (Annualized Return): {summary_metrics['annualized_return']*100:+.2f}%")
+        emit(f"  - 实际最大回撤 (Actual MDD): {summary_metrics['mdd']*100:.2f}%")
+        emit("-" * 125)
     
     # 打印每日预测明细
     header = f"{'预测日期':<12} | {'预测H/L/C':<45} | {'实际H/L/C':<45} | {'收盘涨跌幅(预/实)':<25} | {'收盘误差':<15}"
-    print(header)
-    print("-" * 150)
+    emit(header)
+    emit("-" * 150)
     
     for day_stat in eval_stats:
-        print(f"\n【预测基准日: {day_stat['date'].strftime('%Y-%m-%d')} | 基准收盘价: {day_stat['curr_price']:.2f}】")
-        print("-" * 150)
+        emit(f"\n【预测基准日: {day_stat['date'].strftime('%Y-%m-%d')} | 基准收盘价: {day_stat['curr_price']:.2f}】")
+        emit("-" * 150)
         for pred_info in day_stat["daily_preds"]:
             pred_high = pred_info["pred_high"]
             pred_low = pred_info["pred_low"]
@@ -873,18 +880,20 @@ def predict(
                 error_close = pred_close - actual_close
                 error_pct = pred_pct - actual_pct
                 actual_hlc_str = f"{actual_high:.2f}/{actual_low:.2f}/{actual_close:.2f}"
-                print(
+                emit(
                     f"{pred_info['date']:<12} | {pred_hlc_str:<45} | {actual_hlc_str:<45} | "
                     f"{pred_pct:>+6.2f}%/{actual_pct:>+6.2f}% | {error_close:>+13.2f} ({error_pct:>+6.2f}pts)"
                 )
             else:
-                print(
+                emit(
                     f"{pred_info['date']:<12} | {pred_hlc_str:<45} | {'--/--/--':<45} | "
                     f"{pred_pct:>+6.2f}%/{'--':<6} | {'--':<15}"
                 )
-        print("=" * 150)
+        emit("=" * 150)
     
-    print("注：H/L/C = 最高价/最低价/收盘价。误差 = 预测值 - 实际值。对于价格项单位为元，对于涨跌幅项单位为百分点 (pts)。\n")
+    emit("注：H/L/C = 最高价/最低价/收盘价。误差 = 预测值 - 实际值。对于价格项单位为元，对于涨跌幅项单位为百分点 (pts)。\n")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
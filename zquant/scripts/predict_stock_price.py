@@ -18,14 +18,19 @@
 加载已训练的模型，对最新数据进行未来 10 日预测。
 """
 
+import functools
 import os
 import sys
+import tarfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import joblib
+import lightgbm as lgb
 from pathlib import Path
 from loguru import logger
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -37,10 +42,27 @@ from zquant.models.data import (
     get_factor_table_name,
     get_spacex_factor_table_name
 )
+from zquant.utils.stock_features import add_derived_features
 
 # 模型存储目录
 ARTIFACT_DIR = Path("ml_artifacts/universal")
 
+# 信号分类模型输出下标 -> 建议
+SIGNAL_MAP = ("卖出", "观望", "买入")
+
+# 预测周期与回归目标 (数组第 0 维顺序)
+HORIZON = 10
+REG_TARGETS = ('close', 'high', 'low')
+
+# 基准指数候选 (按优先级)
+POTENTIAL_INDICES = ('000300.SH', '000001.SH', '399300.SZ', '399001.SZ')
+
+# 单个预测日的预测值与实际值
+DailyPred = namedtuple(
+    'DailyPred',
+    'date pred_high pred_low pred_close pred_pct actual_high actual_low actual_close',
+)
+
 def resolve_model_id_for_prediction(ts_code: str) -> str:
     """
     默认使用通用模型（universal_*）进行预测；若通用模型不存在，则回退到单股模型（{ts_code}_*）。
@@ -49,27 +71,57 @@ def resolve_model_id_for_prediction(ts_code: str) -> str:
         ARTIFACT_DIR / "universal_features.pkl",
         ARTIFACT_DIR / "universal_cls_signal.pkl",
     ]
-    if all(p.exists() for p in universal_required):
+    universal_checks = [(p, os.path.isfile(p)) for p in universal_required]
+    if all(exists for _, exists in universal_checks):
         return "universal"
 
     stock_required = [
         ARTIFACT_DIR / f"{ts_code}_features.pkl",
         ARTIFACT_DIR / f"{ts_code}_cls_signal.pkl",
     ]
-    if all(p.exists() for p in stock_required):
+    stock_checks = [(p, os.path.isfile(p)) for p in stock_required]
+    if all(exists for _, exists in stock_checks):
         return ts_code
 
-    # 让调用方按统一错误提示处理
-    missing = [str(p) for p in (universal_required + stock_required) if not Path(p).exists()]
+    # 让调用方按统一错误提示处理 (复用上面的检查结果，不再重复 stat)
+    missing = [str(p) for p, exists in universal_checks + stock_checks if not exists]
     raise FileNotFoundError(f"找不到可用模型（universal 或 {ts_code}），缺失: {', '.join(missing)}")
 
+def _load_reg_models(model_id: str) -> dict:
+    """
+    加载 10 日 High/Low/Close 回归模型，键为 '{target}_t{day}'。
+
+    优先读取训练脚本打包的 {model_id}_reg.tar（LightGBM 原生文本格式）；
+    不存在时回退到旧版逐个 joblib 保存的 {model_id}_reg_{target}_t{day}.pkl。
+    """
+    keys = [f'{t}_t{i}' for i in range(1, HORIZON + 1) for t in REG_TARGETS]
+    bundle_path = ARTIFACT_DIR / f"{model_id}_reg.tar"
+    if bundle_path.is_file():
+        with tarfile.open(bundle_path, mode='r') as tar:
+            model_strs = [tar.extractfile(f"reg_{k}.txt").read().decode('utf-8') for k in keys]
+        # 模型文本解析在 LightGBM C 层完成（释放 GIL），多线程并行
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return dict(zip(keys, executor.map(lambda m: lgb.Booster(model_str=m), model_strs), strict=True))
+
+    # 旧格式：冷缓存下以磁盘 I/O 为主，多线程并行读取；numpy 数组按 mmap 映射
+    reg_paths = [ARTIFACT_DIR / f"{model_id}_reg_{k}.pkl" for k in keys]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return dict(zip(keys, executor.map(lambda p: joblib.load(p, mmap_mode='r'), reg_paths), strict=True))
+
+@functools.lru_cache(maxsize=4096)
+def _table_names(ts_code: str) -> tuple[str, str, str, str]:
+    """ts_code 对应的日线/每日指标/因子/SpaceX 因子分表名 (表名无法参数化绑定，缓存以保持 SQL 文本稳定)"""
+    return (
+        get_daily_table_name(ts_code),
+        get_daily_basic_table_name(ts_code),
+        get_factor_table_name(ts_code),
+        get_spacex_factor_table_name(ts_code),
+    )
+
 def load_prediction_data(ts_code: str, start_date='2026-01-01'):
     """加载预测所需的数据"""
     with get_db_context() as db:
-        daily_table = get_daily_table_name(ts_code)
-        basic_table = get_daily_basic_table_name(ts_code)
-        factor_table = get_factor_table_name(ts_code)
-        spacex_table = get_spacex_factor_table_name(ts_code)
+        daily_table, basic_table, factor_table, spacex_table = _table_names(ts_code)
 
         # 加载 2026-01-01 之后的数据，并包含往前 60 天的数据以计算特征
         query = f"""
@@ -82,57 +134,60 @@ def load_prediction_data(ts_code: str, start_date='2026-01-01'):
         LEFT JOIN `{basic_table}` b ON d.trade_date = b.trade_date
         LEFT JOIN `{factor_table}` f ON d.trade_date = f.trade_date
         LEFT JOIN `{spacex_table}` s ON d.trade_date = s.trade_date
-        WHERE d.trade_date >= DATE_SUB('{start_date}', INTERVAL 60 DAY)
+        WHERE d.trade_date >= DATE_SUB(:start_date, INTERVAL 60 DAY)
         ORDER BY d.trade_date ASC
         """
         
-        df = pd.read_sql(text(query), db.bind)
+        # 直接取 DB-API 行元组构造 DataFrame，跳过 read_sql 的逐行包装与类型探测
+        result = db.execute(text(query), {'start_date': start_date})
+        df = pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()), coerce_float=True)
         df['trade_date'] = pd.to_datetime(df['trade_date'])
         return df
 
 def feature_engineering(df):
-    """特征工程 (需与训练脚本一致)"""
-    for window in [5, 10, 20]:
-        df[f'ma_{window}'] = df['close'].rolling(window).mean() / df['close'] - 1
-        df[f'vol_ma_{window}'] = df['vol'].rolling(window).mean() / df['vol'] - 1
-        
-    for lag in [1, 2, 3]:
-        df[f'pct_chg_lag_{lag}'] = df['pct_chg'].shift(lag)
-        
-    df['dist_boll_upper'] = df['boll_upper'] / df['close'] - 1
-    df['dist_boll_lower'] = df['boll_lower'] / df['close'] - 1
-    
-    df = df.ffill().bfill()
-    
-    # 强制转换数值类型，防止 lightgbm 报错
-    for col in df.columns:
-        if col != 'trade_date':
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    """特征工程 (衍生特征与训练脚本共用 add_derived_features，按同一精度计算)"""
+    df = add_derived_features(df)
+
+    # 强制转换数值类型，防止 lightgbm 报错；仅处理非数值列 (如含 NULL 的 object 列)，
+    # 先转换再统一填充，只需一次 ffill/bfill
+    obj_cols = df.select_dtypes(exclude='number').columns.difference(['trade_date'], sort=False)
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].apply(pd.to_numeric, errors='coerce')
     
     df = df.ffill().bfill()
     return df
 
 def load_index_data(start_date, eval_days):
     """尝试加载基准指数数据 (如沪深300)"""
-    # 常见的指数代码尝试
-    potential_indices = ['000300.SH', '000001.SH', '399300.SZ', '399001.SZ']
+    # 截止日期在客户端计算，不再依赖服务端 DATE_SUB
+    cutoff = (pd.Timestamp(start_date) - pd.Timedelta(days=5)).date()
     
     with get_db_context() as db:
-        for idx_code in potential_indices:
+        # 一次 information_schema 查询只检查候选指数的分表，避免列出全部日线分表
+        candidate_tables = [get_daily_table_name(idx_code) for idx_code in POTENTIAL_INDICES]
+        query = text(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name IN :names"
+        ).bindparams(bindparam("names", expanding=True))
+        try:
+            res = db.execute(query, {"names": candidate_tables})
+            tables = {row[0] for row in res.fetchall()}
+        except Exception:
+            return None, None
+
+        for idx_code in POTENTIAL_INDICES:
             try:
                 table_name = get_daily_table_name(idx_code)
-                # 检查表是否存在
-                check_query = f"SHOW TABLES LIKE '{table_name}'"
-                if not db.execute(text(check_query)).fetchone():
+                if table_name not in tables:
                     continue
                 
                 query = f"""
                 SELECT trade_date, close as index_close
                 FROM `{table_name}`
-                WHERE trade_date >= DATE_SUB('{start_date}', INTERVAL 5 DAY)
+                WHERE trade_date >= :cutoff
                 ORDER BY trade_date ASC
                 """
-                df_idx = pd.read_sql(text(query), db.bind)
+                df_idx = pd.read_sql(text(query), db.bind, params={'cutoff': cutoff})
                 if not df_idx.empty:
                     df_idx['trade_date'] = pd.to_datetime(df_idx['trade_date'])
                     logger.info(f"已自动匹配基准指数数据: {idx_code}")
@@ -141,6 +196,21 @@ def load_index_data(start_date, eval_days):
                 continue
     return None, None
 
+def calculate_mdd(prices) -> float:
+    """最大回撤"""
+    a = np.asarray(prices, dtype=np.float64)
+    if a.size == 0:
+        return 0.0
+    return float((a / np.maximum.accumulate(a) - 1).min())
+
+def calculate_returns(prices) -> np.ndarray:
+    """逐期收益率 (等价于 pct_change().dropna()，序列中的 NaN 仅可能出现在开头)"""
+    a = np.asarray(prices, dtype=np.float64)
+    if a.size < 2:
+        return np.empty(0)
+    returns = np.diff(a) / a[:-1]
+    return returns[~np.isnan(returns)]
+
 def predict(ts_code: str, start_date='2026-01-01', eval_days=15):
     """执行多日循环预测并汇总评估指标"""
     try:
@@ -163,8 +233,11 @@ def predict(ts_code: str, start_date='2026-01-01', eval_days=15):
     # 尝试获取指数基准数据
     df_idx, idx_name = load_index_data(start_date, eval_days)
     if df_idx is not None:
-        df = pd.merge(df, df_idx, on='trade_date', how='left')
+        # 两侧 trade_date 均升序且唯一，按索引对齐即可，无需 merge 哈希
+        df = df.set_index('trade_date')
+        df['index_close'] = df_idx.set_index('trade_date')['index_close']
         df['index_close'] = df['index_close'].ffill()
+        df = df.reset_index()
     
     # 确定评估范围
     target_dt = pd.to_datetime(start_date)
@@ -182,118 +255,117 @@ def predict(ts_code: str, start_date='2026-01-01', eval_days=15):
         if col not in df.columns:
             df[col] = 0.0
     
-    # 预加载模型以提高循环效率
-    models_reg = {}
-    for i in range(1, 11):
-        for t in ['close', 'high', 'low']:
-            models_reg[f'{t}_t{i}'] = joblib.load(ARTIFACT_DIR / f"{model_id}_reg_{t}_t{i}.pkl")
+    models_reg = _load_reg_models(model_id)
     cls_signal = joblib.load(cls_signal_path)
 
-    # 1. 循环执行每日预测并收集评估数据
+    # 1. 批量推理：每个模型对全部基准日只调用一次 predict
+    # trade_date 升序，eval_rows 是 df 的尾部切片；特征从 df 取，以包含上面补齐的缺失列。
+    # 仅将特征矩阵转为 float32（价格列仍保留 float64 供报告计算），推理带宽减半
+    eval_start = len(df) - len(eval_rows)
+    X_all = df[features].iloc[eval_start:eval_start + num_to_eval].astype(np.float32, copy=False)
+    reg_preds = np.empty((len(REG_TARGETS), HORIZON, num_to_eval))
+    for t_idx, t in enumerate(REG_TARGETS):
+        for d in range(1, HORIZON + 1):
+            reg_preds[t_idx, d - 1] = models_reg[f'{t}_t{d}'].predict(X_all)
+    probs_all = cls_signal.predict_proba(X_all)
+    conf_all = probs_all.max(axis=1)
+    signal_idx_all = probs_all.argmax(axis=1)
+
+    # 2. 循环整理每日预测并收集评估数据
     eval_stats = []
+    # 行情列一次性取为数组，循环内按位置读取标量，避免逐行构造 Series
+    n_rows = len(df)
+    close_arr = df['close'].to_numpy()
+    high_arr = df['high'].to_numpy()
+    low_arr = df['low'].to_numpy()
+    date_arr = df['trade_date'].to_numpy()
+    date_strs = df['trade_date'].dt.strftime('%Y-%m-%d').to_numpy()
+    # T+1 评估数据按列预分配，供汇总指标向量化计算
+    anchor_pos = eval_start + np.arange(num_to_eval)
+    pred_pct_t1 = reg_preds[0, 0]
+    curr_prices = close_arr[anchor_pos]
+    # 预测价格 = 基准收盘价 * (1 + 预测收益率)，收盘收益率同时作为 pred_pct 复用
+    pred_prices = curr_prices * (1 + reg_preds)
+    actual_t1 = np.full(num_to_eval, np.nan)
     for i in range(num_to_eval):
-        anchor_row = eval_rows.iloc[i]
-        anchor_date = anchor_row['trade_date']
-        current_price = anchor_row['close']
-        X = anchor_row[features].astype(float).to_frame().T
+        base_pos = anchor_pos[i]
+        anchor_date = pd.Timestamp(date_arr[base_pos])
+        current_price = curr_prices[i]
         
         # 10 日详细预测
         daily_preds = []
-        for d in range(1, 11):
-            pred_close = current_price * (1 + models_reg[f'close_t{d}'].predict(X)[0])
-            pred_high = current_price * (1 + models_reg[f'high_t{d}'].predict(X)[0])
-            pred_low = current_price * (1 + models_reg[f'low_t{d}'].predict(X)[0])
-            pred_pct = models_reg[f'close_t{d}'].predict(X)[0]
+        for d in range(1, HORIZON + 1):
+            pred_pct = reg_preds[0, d - 1, i]
+            pred_close = pred_prices[0, d - 1, i]
+            pred_high = pred_prices[1, d - 1, i]
+            pred_low = pred_prices[2, d - 1, i]
             
             # 实际结果
             actual_c, actual_h, actual_l = np.nan, np.nan, np.nan
             date_str = f"T+{d}"
-            idx_list = df.index[df['trade_date'] == anchor_date].tolist()
-            if idx_list:
-                target_idx = idx_list[0] + d
-                if target_idx < len(df):
-                    row = df.iloc[target_idx]
-                    actual_c, actual_h, actual_l = row['close'], row['high'], row['low']
-                    date_str = row['trade_date'].strftime('%Y-%m-%d')
+            target_idx = base_pos + d
+            if target_idx < n_rows:
+                actual_c, actual_h, actual_l = close_arr[target_idx], high_arr[target_idx], low_arr[target_idx]
+                date_str = date_strs[target_idx]
             
-            daily_preds.append({
-                'date': date_str,
-                'pred_high': pred_high, 'pred_low': pred_low, 'pred_close': pred_close, 'pred_pct': pred_pct,
-                'actual_high': actual_h, 'actual_low': actual_l, 'actual_close': actual_c
-            })
+            daily_preds.append(DailyPred(
+                date_str, pred_high, pred_low, pred_close, pred_pct, actual_h, actual_l, actual_c
+            ))
 
         # 信号和置信度
-        pred_probs = cls_signal.predict_proba(X)[0]
-        confidence = np.max(pred_probs)
-        signal_map = {0: "卖出", 1: "观望", 2: "买入"}
-        overall_signal = signal_map[np.argmax(pred_probs)]
+        confidence = conf_all[i]
+        overall_signal = SIGNAL_MAP[signal_idx_all[i]]
 
         # T+1 实际收盘 (用于汇总评估)
-        actual_price_t1 = np.nan
-        if len(daily_preds) > 0:
-            actual_price_t1 = daily_preds[0]['actual_close']
+        actual_t1[i] = daily_preds[0].actual_close
         
         eval_stats.append({
             'date': anchor_date,
             'curr_price': current_price,
-            'pred_pct_t1': daily_preds[0]['pred_pct'],
-            'actual_price_t1': actual_price_t1,
             'daily_preds': daily_preds,
             'overall_signal': overall_signal,
             'confidence': confidence
         })
 
-    # 2. 计算汇总评估指标 (基于 T+1 预测)
-    valid_eval = [s for s in eval_stats if not np.isnan(s['actual_price_t1'])]
+    # 3. 计算汇总评估指标 (基于 T+1 预测)
+    valid_mask = ~np.isnan(actual_t1)
+    valid_count = int(valid_mask.sum())
     summary_metrics = None
-    if valid_eval:
+    if valid_count:
+        prices = actual_t1[valid_mask]
+        valid_curr = curr_prices[valid_mask]
+
         # 胜率: 预测方向与实际方向一致
-        correct_direction = 0
-        for s in valid_eval:
-            pred_dir = 1 if s['pred_pct_t1'] > 0 else -1
-            actual_dir = 1 if s['actual_price_t1'] > s['curr_price'] else -1
-            if pred_dir == actual_dir:
-                correct_direction += 1
-        win_rate = correct_direction / len(valid_eval)
+        win_rate = float(np.mean((pred_pct_t1[valid_mask] > 0) == (prices > valid_curr)))
         
         # 最大回撤 & 收益率
-        prices = [s['actual_price_t1'] for s in valid_eval]
-        initial_price = valid_eval[0]['curr_price']
-        final_price = valid_eval[-1]['actual_price_t1']
-        
-        total_return = (final_price / initial_price - 1)
-        annualized_return = (1 + total_return) ** (250 / len(valid_eval)) - 1
+        total_return = (prices[-1] / valid_curr[0] - 1)
+        annualized_return = (1 + total_return) ** (250 / valid_count) - 1
         
-        def calculate_mdd(p_list):
-            if not p_list: return 0
-            ser = pd.Series(p_list)
-            return (ser / ser.cummax() - 1).min()
         mdd_actual = calculate_mdd(prices)
         
-        actual_returns = pd.Series(prices).pct_change().dropna()
+        actual_returns = calculate_returns(prices)
         
         # 计算 Alpha 和 Beta
-        alpha = actual_returns.mean() * 250 if not actual_returns.empty else 0
+        alpha = actual_returns.mean() * 250 if actual_returns.size else 0
         beta = 1.00
         benchmark_info = "相对 0 基准"
         
         if df_idx is not None and 'index_close' in df.columns:
             # 获取对应的指数收益率
-            eval_dates = [s['date'] for s in valid_eval]
-            idx_series = df[df['trade_date'].isin(eval_dates)]['index_close']
-            if len(idx_series) == len(prices):
-                idx_returns = idx_series.pct_change().dropna()
-                if not idx_returns.empty and not actual_returns.empty:
-                    # 简单 Beta 计算: Cov(rs, rm) / Var(rm)
-                    common_len = min(len(actual_returns), len(idx_returns))
-                    rs = actual_returns.values[-common_len:]
-                    rm = idx_returns.values[-common_len:]
-                    beta = np.cov(rs, rm)[0, 1] / np.var(rm) if np.var(rm) != 0 else 1.0
-                    alpha = (rs.mean() - beta * rm.mean()) * 250
-                    benchmark_info = f"相对 {idx_name}"
+            idx_returns = calculate_returns(df['index_close'].to_numpy()[anchor_pos[valid_mask]])
+            if idx_returns.size and actual_returns.size:
+                # 简单 Beta 计算: Cov(rs, rm) / Var(rm)
+                common_len = min(len(actual_returns), len(idx_returns))
+                rs = actual_returns[-common_len:]
+                rm = idx_returns[-common_len:]
+                var_rm = rm.var()
+                beta = np.cov(rs, rm)[0, 1] / var_rm if var_rm != 0 else 1.0
+                alpha = (rs.mean() - beta * rm.mean()) * 250
+                benchmark_info = f"相对 {idx_name}"
 
         summary_metrics = {
-            'count': len(valid_eval),
+            'count': valid_count,
             'win_rate': win_rate,
             'total_return': total_return,
             'annualized_return': annualized_return,
@@ -303,23 +375,25 @@ def predict(ts_code: str, start_date='2026-01-01', eval_days=15):
             'benchmark': benchmark_info
         }
 
-    # 3. 打印报告
-    print("\n" + "="*125)
-    print(f"股票 {eval_days} 日循环评估报告: {ts_code} | 使用模型: {model_id}")
-    print(f"评估周期: {eval_stats[0]['date'].strftime('%Y-%m-%d')} 至 {eval_stats[-1]['date'].strftime('%Y-%m-%d')} ({num_to_eval} 交易日)")
-    print("-" * 125)
+    # 4. 打印报告 (先缓冲再一次性输出)
+    lines = []
+    emit = lines.append
+    emit("\n" + "="*125)
+    emit(f"股票 {eval_days} 日循环评估报告: {ts_code} | 使用模型: {model_id}")
+    emit(f"评估周期: {eval_stats[0]['date'].strftime('%Y-%m-%d')} 至 {eval_stats[-1]['date'].strftime('%Y-%m-%d')} ({num_to_eval} 交易日)")
+    emit("-" * 125)
 
     if summary_metrics:
-        print(f"【汇总评估 (基于前 {summary_metrics['count']} 个已实现 T+1 交易日)】")
-        print(f"  - 累计收益率 (Total Return): {summary_metrics['total_return']*100:+.2f}%")
-        print(f"  - 年化收益率 (Annualized Return): {summary_metrics['annualized_return']*100:+.2f}%")
-        print(f"  - 预测胜率 (Win Rate): {summary_metrics['win_rate']*100:.2f}%")
-        print(f"  - 实际最大回撤 (Actual MDD): {summary_metrics['mdd']*100:.2f}%")
-        print(f"  - 年化阿尔法 (Alpha): {summary_metrics['alpha']:.4f} ({summary_metrics['benchmark']})")
-        print(f"  - 贝塔系数 (Beta): {summary_metrics['beta']:.2f}")
-        print("-" * 125)
-
-    # 4. 打印每日预测明细
+        emit(f"【汇总评估 (基于前 {summary_metrics['count']} 个已实现 T+1 交易日)】")
+        emit(f"  - 累计收益率 (Total Return): {summary_metrics['total_return']*100:+.2f}%")
+        emit(f"  - 年化收益率 (Annualized Return): {summary_metrics['annualized_return']*100:+.2f}%")
+        emit(f"  - 预测胜率 (Win Rate): {summary_metrics['win_rate']*100:.2f}%")
+        emit(f"  - 实际最大回撤 (Actual MDD): {summary_metrics['mdd']*100:.2f}%")
+        emit(f"  - 年化阿尔法 (Alpha): {summary_metrics['alpha']:.4f} ({summary_metrics['benchmark']})")
+        emit(f"  - 贝塔系数 (Beta): {summary_metrics['beta']:.2f}")
+        emit("-" * 125)
+
+    # 5. 打印每日预测明细
     header = f"{'预测交易日':<7} | {'最高 (实/预/差)':<20} | {'最低 (实/预/差)':<20} | {'收盘 (实/预/差)':<20} | {'涨跌幅 (实/预/差)':<20}"
     
     def format_val(act, pred, base_price, is_pct=False):
@@ -333,19 +407,21 @@ def predict(ts_code: str, start_date='2026-01-01', eval_days=15):
         return f"{act:>6.2f}/{pred:>6.2f}/{pred-act:>+5.2f}"
 
     for day_stat in eval_stats:
-        print(f"【最新预测建议】(基准日: {day_stat['date'].strftime('%Y-%m-%d')})")
-        print(f"综合建议: {day_stat['overall_signal']} (置信度: {day_stat['confidence']*100:.1f}%) | 基准收盘价: {day_stat['curr_price']:.2f}")
-        print("-" * 125)
-        print(header)
-        print("-" * 125)
+        emit(f"【最新预测建议】(基准日: {day_stat['date'].strftime('%Y-%m-%d')})")
+        emit(f"综合建议: {day_stat['overall_signal']} (置信度: {day_stat['confidence']*100:.1f}%) | 基准收盘价: {day_stat['curr_price']:.2f}")
+        emit("-" * 125)
+        emit(header)
+        emit("-" * 125)
         for r in day_stat['daily_preds']:
-            print(f"{r['date']:<12} | {format_val(r['actual_high'], r['pred_high'], day_stat['curr_price']):<25} | "
-                  f"{format_val(r['actual_low'], r['pred_low'], day_stat['curr_price']):<25} | "
-                  f"{format_val(r['actual_close'], r['pred_close'], day_stat['curr_price']):<25} | "
-                  f"{format_val(r['actual_close'], r['pred_pct'], day_stat['curr_price'], True)}")
-        print("="*125)
+            emit(f"{r.date:<12} | {format_val(r.actual_high, r.pred_high, day_stat['curr_price']):<25} | "
+                  f"{format_val(r.actual_low, r.pred_low, day_stat['curr_price']):<25} | "
+                  f"{format_val(r.actual_close, r.pred_close, day_stat['curr_price']):<25} | "
+                  f"{format_val(r.actual_close, r.pred_pct, day_stat['curr_price'], True)}")
+        emit("="*125)
 
-    print("注：差 = 预测值 - 实际值。对于价格项单位为元，对于涨跌幅项单位为百分点 (pts)。\n")
+    emit("注：差 = 预测值 - 实际值。对于价格项单位为元，对于涨跌幅项单位为百分点 (pts)。\n")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 def check_database_status():
     """检查数据库表状态 (原 list_tables.py 逻辑)"""
@@ -2,6 +2,7 @@
 填充测试数据：使用Tushare获取真实历史数据
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 from pathlib import Path
 import sys
@@ -17,8 +18,12 @@ sys.path.insert(0, str(project_root))
 from loguru import logger
 
 from zquant.data.etl.scheduler import DataScheduler
+from zquant.data.view_manager import create_or_update_daily_view
 from zquant.database import SessionLocal
 
+# 日线同步并发数（I/O 密集，按股票并行）
+SYNC_WORKERS = 8
+
 
 def seed_data():
     """填充测试数据"""
@@ -52,11 +57,24 @@ def seed_data():
             
         stocks = query.limit(10).all()
 
-        for stock in stocks:
+        start_s = start_date.strftime("%Y%m%d")
+        end_s = end_date.strftime("%Y%m%d")
+
+        def _sync_one(ts_code: str):
+            # 每个线程使用独立会话，批量同步时不更新视图，减少锁竞争
+            worker_db = SessionLocal()
             try:
-                scheduler.sync_daily_data(db, stock.ts_code, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"))
+                scheduler.sync_daily_data(worker_db, ts_code, start_s, end_s, update_view=False)
             except Exception as e:
-                logger.warning(f"同步 {stock.ts_code} 数据失败: {e}")
+                logger.warning(f"同步 {ts_code} 数据失败: {e}")
+            finally:
+                worker_db.close()
+
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+            list(executor.map(_sync_one, [stock.ts_code for stock in stocks]))
+
+        # 完成后统一更新日线视图
+        create_or_update_daily_view(db)
 
         logger.info("测试数据填充完成")
 
@@ -6,6 +6,11 @@ import subprocess
 import sys
 import os
 
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，缺失时回退到 netstat/kill
+    psutil = None
+
 # 修复 Windows 控制台中文输出乱码问题
 if sys.platform == "win32":
     try:
@@ -19,6 +24,24 @@ if sys.platform == "win32":
 
 def get_processes_on_port(port):
     """获取监听指定端口的进程"""
+    if psutil is not None:
+        try:
+            # 直接按端口过滤监听连接，无需解析整张 netstat 输出
+            return list(
+                {
+                    str(c.pid)
+                    for c in psutil.net_connections(kind="inet")
+                    if c.laddr and c.laddr.port == port and c.status == psutil.CONN_LISTEN and c.pid
+                }
+            )
+        except psutil.Error:
+            # 部分平台（如 macOS 非 root）无权限枚举连接，回退到 netstat
+            pass
+    return _get_processes_on_port_netstat(port)
+
+
+def _get_processes_on_port_netstat(port):
+    """通过 netstat 获取监听指定端口的进程"""
     try:
         result = subprocess.run(
             ["netstat", "-ano"],
@@ -44,6 +67,12 @@ def get_processes_on_port(port):
 
 def kill_process(pid):
     """终止进程"""
+    if psutil is not None:
+        try:
+            psutil.Process(int(pid)).kill()
+            return True
+        except psutil.Error:
+            return False
     try:
         if sys.platform == "win32":
             subprocess.run(["taskkill", "/F", "/PID", pid], check=True, capture_output=True)
@@ -21,16 +21,17 @@
 """
 
 import argparse
+import functools
 import random
 import sys
 from pathlib import Path
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import torch
 from loguru import logger
 from sqlalchemy import inspect, text
 from torch import nn
-from torch.utils.data import DataLoader, TensorDataset, WeightedRandomSampler
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -47,10 +48,31 @@ from zquant.models.data import (
 ARTIFACT_DIR = Path("ml_artifacts/lstm")
 ARTIFACT_DIR.mkdir(exist_ok=True)
 
+# 分块读取的行数
+READ_CHUNK_SIZE = 50_000
+# 日线价格流式读取时每批拉取的行数
+DAILY_FETCH_SIZE = 10_000
+# 库中所有表和视图名（首次使用时反射一次）
+_TABLE_SET: set[str] | None = None
+
+
+def _get_table_set() -> set[str]:
+    global _TABLE_SET
+    if _TABLE_SET is None:
+        inspector = inspect(engine)
+        _TABLE_SET = set(inspector.get_table_names()) | set(inspector.get_view_names())
+    return _TABLE_SET
+
+
+def _invalidate_table_cache() -> None:
+    """运行期间建表/删表后调用，清空表名和列名缓存"""
+    global _TABLE_SET
+    _TABLE_SET = None
+    _table_columns.cache_clear()
+
 
 def _table_exists(table_name: str) -> bool:
-    inspector = inspect(engine)
-    return inspector.has_table(table_name)
+    return table_name in _get_table_set()
 
 
 def _select_ts_codes_from_view(
@@ -101,8 +123,7 @@ def _select_ts_codes_from_tables(
     min_mv = min_mv_yi * 10_000  # 亿元 -> 万元
     max_mv = max_mv_yi * 10_000  # 亿元 -> 万元
 
-    inspector = inspect(engine)
-    tables = [t for t in inspector.get_table_names() if t.startswith("zq_data_tustock_daily_basic_")]
+    tables = [t for t in _get_table_set() if t.startswith("zq_data_tustock_daily_basic_")]
     tables = [t for t in tables if not t.endswith("_view")]
     tables.sort()
 
@@ -213,31 +234,103 @@ def select_ts_codes(
     return selected_codes
 
 
-def load_spacex_factors(ts_code: str) -> pd.DataFrame:
-    spacex_table = get_spacex_factor_table_name(ts_code)
-    if not _table_exists(spacex_table):
+@functools.lru_cache(maxsize=4096)
+def _table_columns(table_name: str) -> tuple[str, ...]:
+    """获取表的列名（进程内缓存，避免每只股票重复反射表结构）"""
+    return tuple(c["name"] for c in inspect(engine).get_columns(table_name))
+
+
+def _read_sql_chunked(sql, conn) -> pd.DataFrame:
+    """分块读取查询结果并拼接，配合 stream_results 使用服务端游标；trade_date 在读取时解析为日期"""
+    chunks = list(pd.read_sql(sql, conn, chunksize=READ_CHUNK_SIZE, parse_dates=["trade_date"]))
+    if not chunks:
         return pd.DataFrame()
-    inspector = inspect(engine)
-    cols = [c["name"] for c in inspector.get_columns(spacex_table)]
-    factor_cols = [c for c in cols if c not in {"id", "ts_code", "trade_date"}]
-    if not factor_cols:
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+
+def _group_codes_by_table(ts_codes: list[str], table_name_func) -> dict[str, list[str]]:
+    """按分表名归组股票代码，同一分表只查询一次"""
+    by_table: dict[str, list[str]] = {}
+    for ts_code in ts_codes:
+        by_table.setdefault(table_name_func(ts_code), []).append(ts_code)
+    return by_table
+
+
+def load_all_spacex_factors(ts_codes: list[str]) -> dict[str, pd.DataFrame]:
+    """
+    批量加载SpaceX因子数据
+
+    所有分表共用一个流式连接读取，表结构只反射一次。
+
+    Returns:
+        {ts_code: 因子数据框}，无表或无因子列的股票不在结果中
+    """
+    result: dict[str, pd.DataFrame] = {}
+    by_table = _group_codes_by_table(ts_codes, get_spacex_factor_table_name)
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for spacex_table, codes in by_table.items():
+            if not _table_exists(spacex_table):
+                continue
+            cols = _table_columns(spacex_table)
+            factor_cols = [c for c in cols if c not in {"id", "ts_code", "trade_date"}]
+            if not factor_cols:
+                continue
+            select_cols = ["trade_date", "ts_code"] + factor_cols
+            sql = text(f"SELECT {', '.join(select_cols)} FROM `{spacex_table}` ORDER BY trade_date ASC")
+            df = _read_sql_chunked(sql, conn)
+            if df.empty:
+                continue
+            for ts_code in codes:
+                result[ts_code] = df
+    return result
+
+
+def _fetch_daily_prices(conn, daily_table: str) -> pd.DataFrame:
+    """流式拉取单张日线分表，按列直接写入定长类型数组，不经过逐行的 DataFrame 推断"""
+    result = conn.execute(text(f"SELECT trade_date, high, low, close FROM `{daily_table}` ORDER BY trade_date ASC"))
+    dates, highs, lows, closes = [], [], [], []
+    for part in result.partitions(DAILY_FETCH_SIZE):
+        d, h, l, c = zip(*part, strict=True)
+        dates.append(np.array(d, dtype="datetime64[ns]"))
+        highs.append(np.array(h, dtype=np.float64))
+        lows.append(np.array(l, dtype=np.float64))
+        closes.append(np.array(c, dtype=np.float64))
+    if not dates:
         return pd.DataFrame()
-    select_cols = ["trade_date", "ts_code"] + factor_cols
-    sql = text(f"SELECT {', '.join(select_cols)} FROM `{spacex_table}` ORDER BY trade_date ASC")
-    df = pd.read_sql(sql, engine)
-    df["trade_date"] = pd.to_datetime(df["trade_date"])
-    return df
+    return pd.DataFrame(
+        {
+            "trade_date": np.concatenate(dates),
+            "high": np.concatenate(highs),
+            "low": np.concatenate(lows),
+            "close": np.concatenate(closes),
+        }
+    )
+
+
+def load_all_daily_prices(ts_codes: list[str]) -> dict[str, pd.DataFrame]:
+    """批量加载日线价格数据（high, low, close），返回 {ts_code: 数据框}"""
+    result: dict[str, pd.DataFrame] = {}
+    by_table = _group_codes_by_table(ts_codes, get_daily_table_name)
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for daily_table, codes in by_table.items():
+            if not _table_exists(daily_table):
+                continue
+            df = _fetch_daily_prices(conn, daily_table)
+            if df.empty:
+                continue
+            for ts_code in codes:
+                result[ts_code] = df
+    return result
+
+
+def load_spacex_factors(ts_code: str) -> pd.DataFrame:
+    """加载单只股票的SpaceX因子数据"""
+    return load_all_spacex_factors([ts_code]).get(ts_code, pd.DataFrame())
 
 
 def load_daily_prices(ts_code: str) -> pd.DataFrame:
     """加载日线价格数据（high, low, close）"""
-    daily_table = get_daily_table_name(ts_code)
-    if not _table_exists(daily_table):
-        return pd.DataFrame()
-    sql = text(f"SELECT trade_date, high, low, close FROM `{daily_table}` ORDER BY trade_date ASC")
-    df = pd.read_sql(sql, engine)
-    df["trade_date"] = pd.to_datetime(df["trade_date"])
-    return df
+    return load_all_daily_prices([ts_code]).get(ts_code, pd.DataFrame())
 
 
 def build_features(
@@ -277,12 +370,14 @@ def build_features(
     df[factor_cols] = df[factor_cols].fillna(0.0)
 
     # 计算每个因子的放大比率
-    amp_cols: list[str] = []
-    for col in factor_cols:
-        rolling_mean = df[col].rolling(amp_window, min_periods=1).mean()
-        amp_col = f"{col}_amp"
-        df[amp_col] = df[col] / rolling_mean.replace(0, np.nan)
-        amp_cols.append(amp_col)
+    # 对整个因子矩阵一次性计算滚动均值，均值为 0 时放大比率记为 NaN
+    rolling_means = df[factor_cols].rolling(amp_window, min_periods=1).mean().to_numpy()
+    vals = df[factor_cols].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amp = np.where(rolling_means != 0, vals / rolling_means, np.nan)
+    amp_df = pd.DataFrame(amp, index=df.index, columns=[f"{c}_amp" for c in factor_cols])
+    df = pd.concat([df, amp_df], axis=1)
+    amp_cols: list[str] = list(amp_df.columns)
 
     df.replace([np.inf, -np.inf], np.nan, inplace=True)
     df = df.ffill().bfill()
@@ -304,12 +399,11 @@ def build_features(
     
     # 增强：放大持续时间（当前处于放大状态的天数）
     # 计算连续放大的天数
-    amplified_mask = df["is_amplified"] == 1
-    # 为每个连续的放大段分配组ID
-    groups = (amplified_mask != amplified_mask.shift()).cumsum()
-    # 在每个组内计算累积计数
-    duration = amplified_mask.groupby(groups).cumsum()
-    df["amplification_duration"] = duration.where(amplified_mask, 0).astype(float)
+    # 累计计数在每个非放大日归零: 减去最近一次非放大日的累计值
+    m = (df["is_amplified"].to_numpy() == 1).astype(np.int64)
+    c = np.cumsum(m)
+    idx_reset = np.maximum.accumulate(np.where(m == 0, c, 0))
+    df["amplification_duration"] = (c - idx_reset).astype(float)
     
     # 增强：放大趋势（最近N天的放大趋势）
     # 计算最近N天的放大强度均值变化趋势
@@ -337,7 +431,7 @@ def build_sequences(
     horizon: int,
     ts_code: str,
     include_amplification_info: bool = True,
-) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[dict]]:
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
     """
     构建LSTM训练序列
     
@@ -354,7 +448,7 @@ def build_sequences(
         - X: 输入特征序列 (n_samples, lookback, n_features)
         - y: 目标价格序列 (n_samples, horizon, 3) - 每行是[high, low, close]
         - base_close: 基准收盘价 (n_samples,)
-        - meta: 元数据列表
+        - meta: 元数据字典 {字段名: 数组(n_samples,)}
     """
     values = df[feature_cols].values.astype(np.float32)
     high = df["high"].values.astype(np.float32)
@@ -362,11 +456,6 @@ def build_sequences(
     close = df["close"].values.astype(np.float32)
     dates = df["trade_date"].dt.strftime("%Y-%m-%d").values
 
-    X_list = []
-    y_list = []
-    base_list = []
-    meta = []
-
     # 提取放大相关信息（如果存在）
     has_amp_info = "is_amplified" in df.columns
     is_amplified = df["is_amplified"].values if has_amp_info else None
@@ -374,36 +463,34 @@ def build_sequences(
     amp_duration = df["amplification_duration"].values if "amplification_duration" in df.columns else None
     amp_trend = df["amplification_trend"].values if "amplification_trend" in df.columns else None
 
-    for i in range(lookback - 1, len(df) - horizon):
-        x = values[i - lookback + 1 : i + 1]
-        # 构建目标矩阵: 每行是[high, low, close]
-        y = np.zeros((horizon, 3), dtype=np.float32)
-        for j in range(horizon):
-            y[j, 0] = high[i + 1 + j]  # high
-            y[j, 1] = low[i + 1 + j]    # low
-            y[j, 2] = close[i + 1 + j]  # close
-        X_list.append(x)
-        y_list.append(y)
-        base_list.append(close[i])
-        
-        # 构建meta信息
-        meta_item = {"ts_code": ts_code, "trade_date": dates[i]}
-        
-        # 添加放大信息（如果启用）
-        if include_amplification_info and has_amp_info:
-            meta_item["is_amplified"] = int(is_amplified[i]) if is_amplified is not None else 0
-            if amp_strength is not None:
-                meta_item["amplification_strength"] = float(amp_strength[i])
-            if amp_duration is not None:
-                meta_item["amplification_duration"] = float(amp_duration[i])
-            if amp_trend is not None:
-                meta_item["amplification_trend"] = float(amp_trend[i])
-        
-        meta.append(meta_item)
+    n_samples = len(df) - horizon - lookback + 1
+    if n_samples <= 0:
+        return np.empty((0, lookback, len(feature_cols))), np.empty((0, horizon, 3)), np.empty((0,)), {}
+
+    # 滑动窗口一次性切出全部样本（视图），再拷贝为连续数组
+    X = np.ascontiguousarray(sliding_window_view(values, (lookback, values.shape[1]))[:n_samples, 0])
+    # 构建目标矩阵: 每行是[high, low, close]
+    hlc = np.stack([high, low, close], axis=1)
+    y = np.ascontiguousarray(sliding_window_view(hlc, (horizon, 3))[lookback : lookback + n_samples, 0])
+    # 样本 i 的锚点为窗口最后一天
+    anchor = slice(lookback - 1, lookback - 1 + n_samples)
+    base_close = close[anchor].copy()
+
+    # 构建meta信息（按列存放的数组）
+    meta = {"ts_code": np.full(n_samples, ts_code, dtype=object), "trade_date": dates[anchor]}
+
+    # 添加放大信息（如果启用）
+    if include_amplification_info and has_amp_info:
+        meta["is_amplified"] = is_amplified[anchor].astype(int)
+        for key, arr in (
+            ("amplification_strength", amp_strength),
+            ("amplification_duration", amp_duration),
+            ("amplification_trend", amp_trend),
+        ):
+            if arr is not None:
+                meta[key] = arr[anchor].astype(float)
 
-    if not X_list:
-        return np.empty((0, lookback, len(feature_cols))), np.empty((0, horizon, 3)), np.empty((0,)), []
-    return np.stack(X_list), np.stack(y_list), np.array(base_list), meta
+    return X, y, base_close, meta
 
 
 class LSTMModel(nn.Module):
@@ -416,6 +503,8 @@ class LSTMModel(nn.Module):
             batch_first=True,
             dropout=dropout if num_layers > 1 else 0.0,
         )
+        # 权重放入连续内存块，cuDNN 可直接调用融合的 RNN kernel
+        self.lstm.flatten_parameters()
         # 输出horizon * 3 (每天3个价格: high, low, close)
         self.head = nn.Linear(hidden_size, horizon * 3)
         self.horizon = horizon
@@ -429,11 +518,56 @@ class LSTMModel(nn.Module):
         return flat_output.view(-1, self.horizon, 3)
 
 
+def combined_loss(pred: torch.Tensor, target: torch.Tensor, constraint_weight: float = 0.1) -> torch.Tensor:
+    """
+    组合损失函数: 价格误差MSE + 关系约束损失
+    Args:
+        pred: 预测值 (batch, horizon, 3) - [high, low, close]
+        target: 目标值 (batch, horizon, 3) - [high, low, close]
+        constraint_weight: 关系约束损失权重
+    Returns:
+        总损失
+    """
+    # 价格误差损失: 对H、L、C分别计算MSE后平均
+    mse_high = nn.functional.mse_loss(pred[:, :, 0], target[:, :, 0])
+    mse_low = nn.functional.mse_loss(pred[:, :, 1], target[:, :, 1])
+    mse_close = nn.functional.mse_loss(pred[:, :, 2], target[:, :, 2])
+    price_loss = (mse_high + mse_low + mse_close) / 3.0
+    
+    # 关系约束损失: 惩罚违反 H >= C >= L 的情况（只对预测值进行检查，因为目标值应该满足约束）
+    # 对于每个样本和每个时间步
+    # 如果 high < close, 惩罚 (close - high)^2
+    # 如果 close < low, 惩罚 (low - close)^2
+    # 如果 high < low, 惩罚 (low - high)^2
+    # H >= C
+    violation_hc = torch.clamp(pred[:, :, 2] - pred[:, :, 0], min=0.0)  # close - high, 如果>0则违反
+    # C >= L
+    violation_cl = torch.clamp(pred[:, :, 1] - pred[:, :, 2], min=0.0)  # low - close, 如果>0则违反
+    # H >= L (这个通常自动满足，但加上更保险)
+    violation_hl = torch.clamp(pred[:, :, 1] - pred[:, :, 0], min=0.0)  # low - high, 如果>0则违反
+    
+    constraint_loss = (torch.mean(violation_hc ** 2) + 
+                       torch.mean(violation_cl ** 2) + 
+                       torch.mean(violation_hl ** 2)) / 3.0
+    
+    return price_loss + constraint_weight * constraint_loss
+
+
+def _script_for_inference(model: nn.Module) -> nn.Module:
+    """将训练好的模型转为冻结的 TorchScript 推理模块，失败时退回 eager 模型"""
+    model.eval()
+    try:
+        return torch.jit.optimize_for_inference(torch.jit.script(model))
+    except Exception as e:
+        logger.warning(f"TorchScript 转换失败，使用 eager 模型推理: {e}")
+        return model
+
+
 def train_lstm(
     X: np.ndarray,
     y: np.ndarray,
     base_close: np.ndarray,
-    meta: list[dict],
+    meta: dict[str, np.ndarray],
     feature_cols: list[str],
     lookback: int,
     horizon: int,
@@ -445,6 +579,7 @@ def train_lstm(
     dropout: float,
     filter_amplified_only: bool = False,
     amp_weight_multiplier: float = 2.0,
+    seed: int | None = None,
 ) -> dict:
     """
     训练LSTM模型
@@ -453,7 +588,7 @@ def train_lstm(
         X: 输入特征序列
         y: 目标值序列
         base_close: 基准收盘价
-        meta: 元数据列表（包含放大信息）
+        meta: 元数据字典（包含放大信息）
         feature_cols: 特征列名
         lookback: 回看窗口
         horizon: 预测未来天数
@@ -465,18 +600,27 @@ def train_lstm(
         dropout: Dropout率
         filter_amplified_only: 是否只训练放大样本
         amp_weight_multiplier: 放大样本的权重倍数
+        seed: 训练样本采样顺序的随机种子
     
     Returns:
         包含模型和评估指标的字典
     """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    use_amp = device.type == "cuda"
+    # 统一为 float32 连续数组（已是 float32 时不拷贝），后续检查和指标计算不会隐式升为 float64
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    base_close = np.ascontiguousarray(base_close, dtype=np.float32)
 
     logger.info("=" * 80)
     logger.info("开始数据预处理和训练准备...")
     
     # 提取放大信息
     logger.debug("提取样本放大信息...")
-    is_amplified = np.array([m.get("is_amplified", 0) for m in meta], dtype=bool)
+    if "is_amplified" in meta:
+        is_amplified = meta["is_amplified"].astype(bool)
+    else:
+        is_amplified = np.zeros(len(X), dtype=bool)
     amplified_count = int(is_amplified.sum())
     total_count = len(X)
     amplified_ratio = amplified_count / total_count if total_count > 0 else 0.0
@@ -493,7 +637,7 @@ def train_lstm(
         X = X[mask]
         y = y[mask]
         base_close = base_close[mask]
-        meta = [meta[i] for i in range(len(meta)) if mask[i]]
+        meta = {k: v[mask] for k, v in meta.items()}
         is_amplified = is_amplified[mask]
         logger.info(f"过滤后样本数: {len(X)} (仅放大样本)")
     else:
@@ -509,7 +653,8 @@ def train_lstm(
     X_train, X_val = X[:split], X[split:]
     y_train, y_val = y[:split], y[split:]
     base_train, base_val = base_close[:split], base_close[split:]
-    meta_train, meta_val = meta[:split], meta[split:]
+    meta_train = {k: v[:split] for k, v in meta.items()}
+    meta_val = {k: v[split:] for k, v in meta.items()}
     is_amplified_train = is_amplified[:split]
     is_amplified_val = is_amplified[split:]
     
@@ -540,98 +685,102 @@ def train_lstm(
         y_val = np.nan_to_num(y_val, nan=0.0, posinf=1e6, neginf=-1e6)
         logger.info("已清理训练目标数据中的无效值")
     
+    # 数据量很小，一次性放到训练设备上，标准化也在设备上原地完成，
+    # 之后按索引切批次，省去 DataLoader 的逐批整理和拷贝
+    # （copy=True: CPU 上 from_numpy 与调用方数组共享内存，原地标准化前必须拷贝）
+    # 验证集超过可用显存的 1/4 时留在主存（锁页），验证时按批拷贝
+    val_device = device
+    if device.type == "cuda":
+        free_bytes, _ = torch.cuda.mem_get_info(device)
+        if X_val.nbytes + y_val.nbytes > free_bytes * 0.25:
+            logger.warning(f"验证集 {(X_val.nbytes + y_val.nbytes) / 2**20:.1f} MB 超过可用显存的 1/4，保留在主存中按批拷贝")
+            val_device = torch.device("cpu")
+    logger.debug("将训练/验证数据预加载到训练设备...")
+    X_train_t = torch.from_numpy(X_train).to(device, dtype=torch.float32, copy=True)
+    X_val_t = torch.from_numpy(X_val).to(val_device, dtype=torch.float32, copy=True)
+    y_train_t = torch.from_numpy(y_train).to(device, dtype=torch.float32, copy=True)
+    y_val_t = torch.from_numpy(y_val).to(val_device, dtype=torch.float32, copy=True)
+
     # 特征标准化
     logger.debug("对特征进行标准化...")
-    feat_mean = X_train.mean(axis=(0, 1), keepdims=True)
-    feat_std = X_train.std(axis=(0, 1), keepdims=True) + 1e-6
+    feat_mean_t = X_train_t.mean(dim=(0, 1), keepdim=True)
+    feat_std_t = X_train_t.std(dim=(0, 1), keepdim=True, correction=0).add_(1e-6)
     
     # 检查标准化参数是否包含 NaN
-    if np.isnan(feat_mean).any() or np.isnan(feat_std).any():
+    if torch.isnan(feat_mean_t).any() or torch.isnan(feat_std_t).any():
         logger.error("特征标准化参数包含 NaN，数据可能存在问题")
         # 用0填充 NaN 均值，用1填充 NaN 标准差
-        feat_mean = np.nan_to_num(feat_mean, nan=0.0)
-        feat_std = np.nan_to_num(feat_std, nan=1.0) + 1e-6
+        feat_mean_t = torch.nan_to_num(feat_mean_t, nan=0.0)
+        feat_std_t = torch.nan_to_num(feat_std_t, nan=1.0) + 1e-6
         logger.warning("已修复标准化参数中的 NaN")
     
-    X_train_n = (X_train - feat_mean) / feat_std
-    X_val_n = (X_val - feat_mean) / feat_std
-    
-    # 检查标准化后的数据
-    x_train_n_nan = np.isnan(X_train_n).sum()
-    x_train_n_inf = np.isinf(X_train_n).sum()
-    if x_train_n_nan > 0 or x_train_n_inf > 0:
-        logger.warning(f"标准化后的训练特征包含无效值: NaN={x_train_n_nan}, Inf={x_train_n_inf}")
-        X_train_n = np.nan_to_num(X_train_n, nan=0.0, posinf=1e6, neginf=-1e6)
-        X_val_n = np.nan_to_num(X_val_n, nan=0.0, posinf=1e6, neginf=-1e6)
-        logger.info("已清理标准化后的特征数据")
-    
+    X_train_t.sub_(feat_mean_t).div_(feat_std_t)
+    X_val_t.sub_(feat_mean_t.to(val_device)).div_(feat_std_t.to(val_device))
+    
+    # 检查标准化后的数据（训练集和验证集分别检查，验证集的无效值不一定出现在训练集中）
+    for split_name, X_t in (("训练", X_train_t), ("验证", X_val_t)):
+        if not torch.isfinite(X_t).all():
+            n_nan = int(torch.isnan(X_t).sum())
+            n_inf = int(torch.isinf(X_t).sum())
+            logger.warning(f"标准化后的{split_name}特征包含无效值: NaN={n_nan}, Inf={n_inf}")
+            torch.nan_to_num_(X_t, nan=0.0, posinf=1e6, neginf=-1e6)
+            logger.info(f"已清理标准化后的{split_name}特征数据")
+    
+    # 混合精度下 LSTM 输入反正会被 autocast 转成 fp16，标准化后直接以 fp16 常驻显存，
+    # 每批次索引和前向读取的字节数减半。fp16 最大约 65504，先截断，避免训练集上近似常数的特征
+    # 在验证集上被放大或 nan_to_num 的 1e6 填充值转换后变成 inf
+    if use_amp:
+        X_train_t = X_train_t.clamp_(-6e4, 6e4).half()
+        X_val_t = X_val_t.clamp_(-6e4, 6e4).half()
+    
+    # 标准化参数以 NumPy 数组返回和保存
+    feat_mean = feat_mean_t.cpu().numpy()
+    feat_std = feat_std_t.cpu().numpy()
     logger.debug(f"特征标准化完成 - 均值范围: [{feat_mean.min():.4f}, {feat_mean.max():.4f}], "
                 f"标准差范围: [{feat_std.min():.4f}, {feat_std.max():.4f}]")
 
     # 目标值标准化: 对H、L、C分别进行标准化
     logger.debug("对目标值进行标准化（H、L、C分别标准化）...")
-    # y_train形状: (n_samples, horizon, 3)
-    # 分别对high(0), low(1), close(2)进行标准化
-    y_mean_high = float(y_train[:, :, 0].mean())
-    y_std_high = float(y_train[:, :, 0].std() + 1e-6)
-    y_mean_low = float(y_train[:, :, 1].mean())
-    y_std_low = float(y_train[:, :, 1].std() + 1e-6)
-    y_mean_close = float(y_train[:, :, 2].mean())
-    y_std_close = float(y_train[:, :, 2].std() + 1e-6)
+    # y_train形状: (n_samples, horizon, 3)，沿前两维一次性求出 high(0), low(1), close(2) 的均值和标准差
+    y_mean_t = y_train_t.mean(dim=(0, 1), keepdim=True)
+    y_std_t = y_train_t.std(dim=(0, 1), keepdim=True, correction=0).add_(1e-6)
+    # 保存标准化参数（用于后续反标准化），形状 (3,)，顺序为 high、low、close
+    y_mean = y_mean_t.reshape(-1).cpu().numpy()
+    y_std = y_std_t.reshape(-1).cpu().numpy()
     
     # 检查标准化参数是否包含 NaN
-    for name, mean_val, std_val in [("high", y_mean_high, y_std_high), 
-                                     ("low", y_mean_low, y_std_low),
-                                     ("close", y_mean_close, y_std_close)]:
-        if np.isnan(mean_val) or np.isnan(std_val):
+    for k, name in enumerate(("high", "low", "close")):
+        if np.isnan(y_mean[k]) or np.isnan(y_std[k]):
             logger.error(f"{name}价格标准化参数包含 NaN，数据可能存在问题")
             raise ValueError(f"{name}价格标准化参数包含 NaN")
     
-    # 分别标准化
-    y_train_n = np.zeros_like(y_train, dtype=np.float32)
-    y_train_n[:, :, 0] = (y_train[:, :, 0] - y_mean_high) / y_std_high
-    y_train_n[:, :, 1] = (y_train[:, :, 1] - y_mean_low) / y_std_low
-    y_train_n[:, :, 2] = (y_train[:, :, 2] - y_mean_close) / y_std_close
-    
-    y_val_n = np.zeros_like(y_val, dtype=np.float32)
-    y_val_n[:, :, 0] = (y_val[:, :, 0] - y_mean_high) / y_std_high
-    y_val_n[:, :, 1] = (y_val[:, :, 1] - y_mean_low) / y_std_low
-    y_val_n[:, :, 2] = (y_val[:, :, 2] - y_mean_close) / y_std_close
+    # 广播标准化
+    y_train_t.sub_(y_mean_t).div_(y_std_t)
+    y_val_t.sub_(y_mean_t.to(val_device)).div_(y_std_t.to(val_device))
     
     # 检查标准化后的目标值
-    y_train_n_nan = np.isnan(y_train_n).sum()
-    y_train_n_inf = np.isinf(y_train_n).sum()
-    if y_train_n_nan > 0 or y_train_n_inf > 0:
+    if not torch.isfinite(y_train_t).all():
+        y_train_n_nan = int(torch.isnan(y_train_t).sum())
+        y_train_n_inf = int(torch.isinf(y_train_t).sum())
         logger.warning(f"标准化后的训练目标包含无效值: NaN={y_train_n_nan}, Inf={y_train_n_inf}")
-        y_train_n = np.nan_to_num(y_train_n, nan=0.0, posinf=1e6, neginf=-1e6)
-        y_val_n = np.nan_to_num(y_val_n, nan=0.0, posinf=1e6, neginf=-1e6)
+        torch.nan_to_num_(y_train_t, nan=0.0, posinf=1e6, neginf=-1e6)
+        torch.nan_to_num_(y_val_t, nan=0.0, posinf=1e6, neginf=-1e6)
         logger.info("已清理标准化后的目标数据")
     
     logger.debug(f"目标值标准化完成:")
-    logger.debug(f"  - High: 均值={y_mean_high:.4f}, 标准差={y_std_high:.4f}")
-    logger.debug(f"  - Low: 均值={y_mean_low:.4f}, 标准差={y_std_low:.4f}")
-    logger.debug(f"  - Close: 均值={y_mean_close:.4f}, 标准差={y_std_close:.4f}")
-    
-    # 保存标准化参数（用于后续反标准化）
-    y_mean = {
-        "high": y_mean_high,
-        "low": y_mean_low,
-        "close": y_mean_close,
-    }
-    y_std = {
-        "high": y_std_high,
-        "low": y_std_low,
-        "close": y_std_close,
-    }
+    logger.debug(f"  - High: 均值={y_mean[0]:.4f}, 标准差={y_std[0]:.4f}")
+    logger.debug(f"  - Low: 均值={y_mean[1]:.4f}, 标准差={y_std[1]:.4f}")
+    logger.debug(f"  - Close: 均值={y_mean[2]:.4f}, 标准差={y_std[2]:.4f}")
 
-    # 创建数据集
-    logger.debug("创建PyTorch数据集...")
-    train_ds = TensorDataset(torch.tensor(X_train_n), torch.tensor(y_train_n))
-    val_ds = TensorDataset(torch.tensor(X_val_n), torch.tensor(y_val_n))
-    logger.debug(f"训练数据集大小: {len(train_ds)}, 验证数据集大小: {len(val_ds)}")
+    if val_device != device:
+        X_val_t = X_val_t.pin_memory()
+        y_val_t = y_val_t.pin_memory()
+    n_train = len(X_train_t)
+    n_val = len(X_val_t)
+    logger.debug(f"训练数据集大小: {n_train}, 验证数据集大小: {n_val}")
     
     # 样本加权：对放大样本设置更高权重
-    train_sampler = None
+    weights = None
     if amp_weight_multiplier > 1.0 and len(is_amplified_train) > 0:
         logger.debug("计算样本权重...")
         # 计算每个样本的权重
@@ -639,11 +788,6 @@ def train_lstm(
         weights[is_amplified_train] = amp_weight_multiplier
         # 归一化权重
         weights = weights / weights.sum() * len(weights)
-        train_sampler = WeightedRandomSampler(
-            weights=weights.tolist(),
-            num_samples=len(weights),
-            replacement=True
-        )
         avg_weight_normal = np.mean(weights[~is_amplified_train]) if (~is_amplified_train).sum() > 0 else 1.0
         avg_weight_amplified = np.mean(weights[is_amplified_train]) if is_amplified_train.sum() > 0 else 1.0
         logger.info(f"样本加权配置:")
@@ -653,62 +797,49 @@ def train_lstm(
     else:
         logger.info("不使用样本加权（使用标准随机采样）")
     
-    # 创建数据加载器
-    logger.debug("创建数据加载器...")
-    train_loader = DataLoader(
-        train_ds, 
-        batch_size=batch_size, 
-        sampler=train_sampler,
-        shuffle=(train_sampler is None),
-        drop_last=False
-    )
-    val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False, drop_last=False)
-    logger.info(f"数据加载器配置:")
-    logger.info(f"  - 训练批次数: {len(train_loader)} (批大小: {batch_size})")
-    logger.info(f"  - 验证批次数: {len(val_loader)} (批大小: {batch_size})")
+    # 每轮的样本顺序在主机端由固定种子的生成器抽取，每轮只拷贝一行 (n_train,) 到训练设备，
+    # 显存占用不随轮数增长：加权时按权重有放回采样，否则每轮随机打乱
+    rng = np.random.default_rng(seed)
+    sample_p = weights / weights.sum() if weights is not None else None
+
+    def epoch_order() -> torch.Tensor:
+        if sample_p is not None:
+            order = rng.choice(n_train, size=n_train, replace=True, p=sample_p)
+        else:
+            order = rng.permutation(n_train)
+        return torch.from_numpy(order).to(device)
+    
+    n_train_batches = (n_train + batch_size - 1) // batch_size
+    n_val_batches = (n_val + batch_size - 1) // batch_size
+    logger.info(f"批次配置:")
+    logger.info(f"  - 训练批次数: {n_train_batches} (批大小: {batch_size})")
+    logger.info(f"  - 验证批次数: {n_val_batches} (批大小: {batch_size})")
 
     # 创建模型
     logger.info("=" * 80)
     logger.info("初始化LSTM模型...")
+    # cuDNN 在隐藏层为 8 的倍数时才能选用 Tensor Core / persistent kernel
+    if hidden_size % 8:
+        rounded = (hidden_size + 7) // 8 * 8
+        logger.info(f"隐藏层大小 {hidden_size} 向上取整为 {rounded}（8 的倍数）")
+        hidden_size = rounded
     model = LSTMModel(len(feature_cols), hidden_size, num_layers, horizon, dropout).to(device)
-    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr, fused=(device.type == "cuda"))
+
+    # 混合精度: CUDA 上以 fp16 autocast 前向，GradScaler 防止梯度下溢；CPU 上全部为空操作
+    if use_amp:
+        torch.backends.cudnn.benchmark = True
+    # torch>=2.3 使用与 torch.autocast 对应的 torch.amp.GradScaler；requirements 锁定的 2.2 尚无此接口，回退到 torch.cuda.amp
+    if hasattr(torch.amp, "GradScaler"):
+        scaler = torch.amp.GradScaler("cuda", enabled=use_amp)
+    else:
+        scaler = torch.cuda.amp.GradScaler(enabled=use_amp)
     
     # 组合损失函数: 价格误差MSE + 关系约束损失
-    def combined_loss(pred, target, constraint_weight=0.1):
-        """
-        组合损失函数
-        Args:
-            pred: 预测值 (batch, horizon, 3) - [high, low, close]
-            target: 目标值 (batch, horizon, 3) - [high, low, close]
-            constraint_weight: 关系约束损失权重
-        Returns:
-            总损失
-        """
-        # 价格误差损失: 对H、L、C分别计算MSE后平均
-        mse_high = nn.functional.mse_loss(pred[:, :, 0], target[:, :, 0])
-        mse_low = nn.functional.mse_loss(pred[:, :, 1], target[:, :, 1])
-        mse_close = nn.functional.mse_loss(pred[:, :, 2], target[:, :, 2])
-        price_loss = (mse_high + mse_low + mse_close) / 3.0
-        
-        # 关系约束损失: 惩罚违反 H >= C >= L 的情况（只对预测值进行检查，因为目标值应该满足约束）
-        # 对于每个样本和每个时间步
-        # 如果 high < close, 惩罚 (close - high)^2
-        # 如果 close < low, 惩罚 (low - close)^2
-        # 如果 high < low, 惩罚 (low - high)^2
-        # H >= C
-        violation_hc = torch.clamp(pred[:, :, 2] - pred[:, :, 0], min=0.0)  # close - high, 如果>0则违反
-        # C >= L
-        violation_cl = torch.clamp(pred[:, :, 1] - pred[:, :, 2], min=0.0)  # low - close, 如果>0则违反
-        # H >= L (这个通常自动满足，但加上更保险)
-        violation_hl = torch.clamp(pred[:, :, 1] - pred[:, :, 0], min=0.0)  # low - high, 如果>0则违反
-        
-        constraint_loss = (torch.mean(violation_hc ** 2) + 
-                         torch.mean(violation_cl ** 2) + 
-                         torch.mean(violation_hl ** 2)) / 3.0
-        
-        return price_loss + constraint_weight * constraint_loss
-    
+    # CUDA 上编译为融合 kernel，减少每批次的 kernel 启动（Windows 暂不支持 torch.compile）
     loss_fn = combined_loss
+    if device.type == "cuda" and sys.platform != "win32":
+        loss_fn = torch.compile(combined_loss, dynamic=False, fullgraph=True)
     
     # 计算模型参数数量
     total_params = sum(p.numel() for p in model.parameters())
@@ -733,116 +864,88 @@ def train_lstm(
     logger.info(f"开始训练，总轮数: {epochs}")
     logger.info("-" * 80)
 
+    # 最佳模型参数的 CPU 副本：一次分配（CUDA 上为锁页内存），每次改进时异步拷入
+    # （拷贝与后续训练在同一 CUDA 流上按序执行，取到的是改进当时的参数）
+    pin_memory = device.type == "cuda"
+    best_state_buf = {
+        k: torch.empty(v.shape, dtype=v.dtype, pin_memory=pin_memory) for k, v in model.state_dict().items()
+    }
+
+    # 每批次损失留在设备上，每轮结束时一次性取回，避免逐批 .item() 同步
+    train_loss_buf = torch.zeros(max(n_train_batches, 1), device=device)
+
     for epoch in range(1, epochs + 1):
         # 训练阶段
         model.train()
-        train_losses = []
         batch_count = 0
         
         logger.debug(f"Epoch {epoch}/{epochs} - 训练阶段开始...")
-        for batch_idx, (xb, yb) in enumerate(train_loader, 1):
-            xb = xb.to(device)
-            yb = yb.to(device)
-            
-            # 检查输入数据是否包含 NaN 或 Inf
-            if torch.isnan(xb).any() or torch.isinf(xb).any():
-                logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 输入特征包含 NaN 或 Inf")
-                logger.debug(f"  NaN 数量: {torch.isnan(xb).sum().item()}, Inf 数量: {torch.isinf(xb).sum().item()}")
-                xb = torch.nan_to_num(xb, nan=0.0, posinf=1e6, neginf=-1e6)
-            
-            if torch.isnan(yb).any() or torch.isinf(yb).any():
-                logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 目标值包含 NaN 或 Inf")
-                logger.debug(f"  NaN 数量: {torch.isnan(yb).sum().item()}, Inf 数量: {torch.isinf(yb).sum().item()}")
-                yb = torch.nan_to_num(yb, nan=0.0, posinf=1e6, neginf=-1e6)
-            
-            pred = model(xb)
-            
-            # 检查模型输出是否包含 NaN 或 Inf
-            if torch.isnan(pred).any() or torch.isinf(pred).any():
-                logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 模型输出包含 NaN 或 Inf")
-                logger.debug(f"  NaN 数量: {torch.isnan(pred).sum().item()}, Inf 数量: {torch.isinf(pred).sum().item()}")
-                logger.debug(f"  输入特征统计: min={xb.min().item():.4f}, max={xb.max().item():.4f}, mean={xb.mean().item():.4f}")
-                logger.debug(f"  目标值统计: min={yb.min().item():.4f}, max={yb.max().item():.4f}, mean={yb.mean().item():.4f}")
-                # 跳过这个批次
-                continue
-            
-            loss = loss_fn(pred, yb)
-            
-            # 检查损失值
-            if torch.isnan(loss) or torch.isinf(loss):
-                logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 损失值为 NaN 或 Inf")
-                logger.debug(f"  预测值范围: [{pred.min().item():.4f}, {pred.max().item():.4f}]")
-                logger.debug(f"  目标值范围: [{yb.min().item():.4f}, {yb.max().item():.4f}]")
-                # 跳过这个批次
-                continue
+        perm = epoch_order()
+        for batch_idx, start in enumerate(range(0, n_train, batch_size), 1):
+            idx = perm[start : start + batch_size]
+            xb = X_train_t[idx]
+            yb = y_train_t[idx]
             
-            optimizer.zero_grad()
-            loss.backward()
+            with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
+                pred = model(xb)
+            # 损失在 fp32 下计算
+            loss = loss_fn(pred.float(), yb)
             
-            # 检查梯度是否包含 NaN 或 Inf
-            has_nan_grad = False
-            for name, param in model.named_parameters():
-                if param.grad is not None:
-                    if torch.isnan(param.grad).any() or torch.isinf(param.grad).any():
-                        logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 参数 {name} 的梯度包含 NaN 或 Inf")
-                        has_nan_grad = True
-                        break
+            optimizer.zero_grad(set_to_none=True)
+            scaler.scale(loss).backward()
+            # 先还原梯度尺度，再做梯度裁剪
+            scaler.unscale_(optimizer)
             
-            if has_nan_grad:
+            # 梯度裁剪，防止梯度爆炸；返回的总范数同时用于检查 NaN/Inf
+            # （输出或损失异常时梯度必然异常，无需逐批单独检查）
+            total_norm = torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+            # CUDA 上由 GradScaler 在设备端跳过梯度非有限的步骤（fused Adam 无需同步），
+            # 不再逐批取回范数判断；无效损失在每轮结束取回时统一剔除
+            if not use_amp and not torch.isfinite(total_norm):
+                logger.error(f"Epoch {epoch} - 训练批次 {batch_idx}: 梯度包含 NaN 或 Inf，跳过")
                 # 跳过这个批次，不更新参数
-                optimizer.zero_grad()
+                optimizer.zero_grad(set_to_none=True)
                 continue
             
-            # 梯度裁剪，防止梯度爆炸
-            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-            
-            optimizer.step()
-            train_losses.append(loss.item())
+            scaler.step(optimizer)
+            scaler.update()
+            train_loss_buf[batch_count] = loss.detach()
             batch_count += 1
             
-            # 每10个批次输出一次进度
-            if batch_idx % 10 == 0 or batch_idx == len(train_loader):
-                logger.debug(f"  Epoch {epoch}/{epochs} - 训练批次 [{batch_idx}/{len(train_loader)}] "
-                           f"当前批次损失: {loss.item():.6f}")
+            # 每10个批次输出一次进度（仅在 DEBUG 级别实际输出时才取回损失）
+            if batch_idx % 10 == 0 or batch_idx == n_train_batches:
+                logger.opt(lazy=True).debug(f"  Epoch {epoch}/{epochs} - 训练批次 [{batch_idx}/{n_train_batches}] "
+                                            "当前批次损失: {:.6f}", lambda loss=loss: loss.item())
 
         # 验证阶段
         model.eval()
-        val_losses = []
         logger.debug(f"Epoch {epoch}/{epochs} - 验证阶段开始...")
-        with torch.no_grad():
-            for batch_idx, (xb, yb) in enumerate(val_loader, 1):
-                xb = xb.to(device)
-                yb = yb.to(device)
+        with torch.inference_mode():
+            val_loss_buf = torch.empty(n_val_batches, device=device)
+            for batch_idx, start in enumerate(range(0, n_val, batch_size)):
+                xb = X_val_t[start : start + batch_size].to(device, non_blocking=True)
+                yb = y_val_t[start : start + batch_size].to(device, non_blocking=True)
                 
-                # 检查输入数据
-                if torch.isnan(xb).any() or torch.isinf(xb).any():
-                    logger.warning(f"Epoch {epoch} - 验证批次 {batch_idx}: 输入特征包含无效值，已清理")
-                    xb = torch.nan_to_num(xb, nan=0.0, posinf=1e6, neginf=-1e6)
-                
-                if torch.isnan(yb).any() or torch.isinf(yb).any():
-                    logger.warning(f"Epoch {epoch} - 验证批次 {batch_idx}: 目标值包含无效值，已清理")
-                    yb = torch.nan_to_num(yb, nan=0.0, posinf=1e6, neginf=-1e6)
-                
-                pred = model(xb)
-                
-                # 检查模型输出
-                if torch.isnan(pred).any() or torch.isinf(pred).any():
-                    logger.warning(f"Epoch {epoch} - 验证批次 {batch_idx}: 模型输出包含无效值，跳过")
-                    continue
-                
-                loss = loss_fn(pred, yb)
-                
-                # 检查损失值
-                if torch.isnan(loss) or torch.isinf(loss):
-                    logger.warning(f"Epoch {epoch} - 验证批次 {batch_idx}: 损失值为无效值，跳过")
-                    continue
-                
-                val_losses.append(loss.item())
-
-        train_loss = float(np.mean(train_losses)) if train_losses else 0.0
-        val_loss = float(np.mean(val_losses)) if val_losses else 0.0
-        train_std = float(np.std(train_losses)) if train_losses else 0.0
-        val_std = float(np.std(val_losses)) if val_losses else 0.0
+                with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
+                    pred = model(xb)
+                val_loss_buf[batch_idx] = loss_fn(pred.float(), yb)
+            val_losses_all = val_loss_buf.cpu().numpy()
+        
+        train_losses_all = train_loss_buf[:batch_count].cpu().numpy()
+        # 检查损失值，跳过无效批次
+        train_valid = np.isfinite(train_losses_all)
+        if not train_valid.all():
+            logger.warning(f"Epoch {epoch} - {int((~train_valid).sum())} 个训练批次损失为无效值，未计入训练损失")
+        train_losses = train_losses_all[train_valid]
+        val_valid = np.isfinite(val_losses_all)
+        if not val_valid.all():
+            logger.warning(f"Epoch {epoch} - 验证批次 {np.flatnonzero(~val_valid) + 1}: 损失值为无效值，跳过")
+        val_losses = val_losses_all[val_valid]
+
+        train_loss = float(np.mean(train_losses, dtype=np.float32)) if train_losses.size else 0.0
+        val_loss = float(np.mean(val_losses, dtype=np.float32)) if val_losses.size else 0.0
+        train_std = float(np.std(train_losses, dtype=np.float32)) if train_losses.size else 0.0
+        val_std = float(np.std(val_losses, dtype=np.float32)) if val_losses.size else 0.0
         
         # 详细日志输出
         logger.info(f"Epoch {epoch}/{epochs}:")
@@ -853,7 +956,9 @@ def train_lstm(
             improvement = best_val - val_loss
             best_val = val_loss
             best_epoch = epoch
-            best_state = {k: v.cpu().clone() for k, v in model.state_dict().items()}
+            for k, v in model.state_dict().items():
+                best_state_buf[k].copy_(v, non_blocking=True)
+            best_state = best_state_buf
             logger.info(f"  ✓ 最佳验证损失更新: {best_val:.6f} (改进: {improvement:.6f}, 轮次: {epoch})")
         else:
             logger.debug(f"  验证损失未改善 (当前最佳: {best_val:.6f}, 轮次: {best_epoch})")
@@ -869,74 +974,87 @@ def train_lstm(
     else:
         logger.warning("未找到最佳模型状态，使用当前模型")
 
-    # 模型评估
+    # 模型评估: 使用 TorchScript 推理模块（eager 模型保留用于保存 state_dict）
     logger.debug("在验证集上进行预测...")
-    model.eval()
-    with torch.no_grad():
-        preds_norm = model(torch.tensor(X_val_n).to(device)).cpu().numpy()
-    
-    # 反标准化: 分别对H、L、C进行反标准化
-    preds = np.zeros_like(preds_norm, dtype=np.float32)
-    preds[:, :, 0] = preds_norm[:, :, 0] * y_std["high"] + y_mean["high"]
-    preds[:, :, 1] = preds_norm[:, :, 1] * y_std["low"] + y_mean["low"]
-    preds[:, :, 2] = preds_norm[:, :, 2] * y_std["close"] + y_mean["close"]
+    eval_model = _script_for_inference(model)
+    amp_mask = is_amplified_val
+    returns_mask = amp_mask & (base_val > 0)  # 收益率统计剔除基准价不为正的样本
+    has_amp = n_val > 0 and bool(amp_mask.any())
+    has_returns = has_amp and bool(returns_mask.any())
+    # 反标准化和各项指标都在训练设备上完成，只把最终的标量拼成一个张量一次性取回
+    stats = {}
+    with torch.inference_mode():
+        # 验证集张量通常已在训练设备上，按批次前向，避免整表一次性前向的显存峰值
+        preds_chunks = []
+        for start in range(0, n_val, batch_size):
+            xb = X_val_t[start : start + batch_size].to(device, non_blocking=True)
+            preds_chunks.append(eval_model(xb.float()))
+        preds_t = torch.cat(preds_chunks) if preds_chunks else torch.empty((0, horizon, 3), device=device)
+        
+        # 反标准化: H、L、C 的均值/标准差按最后一维广播，一次完成
+        preds_t = preds_t * y_std_t + y_mean_t
+        y_val_raw_t = torch.from_numpy(y_val).to(device, dtype=torch.float32)
+        # 基准价只上传一次并整形为 (n, 1) 列，方向准确率和放大样本收益率共用
+        base_t = torch.from_numpy(base_val).to(device, dtype=torch.float32).unsqueeze(1)
+        
+        if n_val:
+            # 误差只计算一次，整体指标和放大样本指标共用
+            diff = preds_t - y_val_raw_t
+            abs_diff = diff.abs()
+            sq_diff = diff * diff
+            # 使用收盘价计算方向，逐样本逐天的方向是否一致
+            match = (torch.sign(preds_t[:, :, 2] - base_t) == torch.sign(y_val_raw_t[:, :, 2] - base_t)).float()
+            pred_h, pred_l, pred_c = preds_t[:, :, 0], preds_t[:, :, 1], preds_t[:, :, 2]
+            # 沿样本和预测天数两维一次性求出 H、L、C 三个通道的 MAE/MSE
+            stats["mae"] = abs_diff.mean(dim=(0, 1))
+            stats["mse"] = sq_diff.mean(dim=(0, 1))
+            stats["dir_acc"] = match.mean()
+            stats["dir_acc_by_day"] = match.mean(dim=0)
+            # 价格关系约束违反数: 分别检查 H >= C、C >= L、H >= L
+            stats["violations"] = (pred_h < pred_c).sum() + (pred_c < pred_l).sum() + (pred_h < pred_l).sum()
+        if has_amp:
+            amp_mask_t = torch.from_numpy(amp_mask).to(device)
+            # H、L、C 样本数相同，逐通道均值再取平均等于整体均值
+            stats["amp_mae"] = abs_diff[amp_mask_t].mean()
+            stats["amp_mse"] = sq_diff[amp_mask_t].mean()
+            stats["amp_dir_acc"] = match[amp_mask_t].mean()
+        if has_returns:
+            # 每个样本 T+1 到 T+horizon 的平均收益率
+            returns_mask_t = torch.from_numpy(returns_mask).to(device)
+            amp_base_t = base_t[returns_mask_t]
+            amp_close_t = y_val_raw_t[returns_mask_t, :, 2]
+            amp_returns = ((amp_close_t - amp_base_t) / amp_base_t).mean(dim=1)
+            stats["amp_return_mean"] = amp_returns.mean()
+            stats["amp_return_std"] = amp_returns.std(correction=0)
+            stats["amp_return_min"] = amp_returns.min()
+            stats["amp_return_max"] = amp_returns.max()
+        
+        sizes = [v.numel() for v in stats.values()]
+        stats_host = torch.cat([v.reshape(-1).double() for v in stats.values()]).cpu() if stats else torch.empty(0)
+        stats = {k: v.tolist() for k, v in zip(stats, stats_host.split(sizes), strict=True)}
+        preds = preds_t.cpu().numpy()
     
-    y_val_raw = y_val
     logger.debug(f"预测完成，预测值范围: H[{preds[:, :, 0].min():.4f}, {preds[:, :, 0].max():.4f}], "
                 f"L[{preds[:, :, 1].min():.4f}, {preds[:, :, 1].max():.4f}], "
                 f"C[{preds[:, :, 2].min():.4f}, {preds[:, :, 2].max():.4f}]")
 
     # 基础评估指标: 分别计算H、L、C的MAE、RMSE
     logger.debug("计算基础评估指标...")
-    mae_high = float(np.mean(np.abs(preds[:, :, 0] - y_val_raw[:, :, 0]))) if len(y_val_raw) else 0.0
-    mae_low = float(np.mean(np.abs(preds[:, :, 1] - y_val_raw[:, :, 1]))) if len(y_val_raw) else 0.0
-    mae_close = float(np.mean(np.abs(preds[:, :, 2] - y_val_raw[:, :, 2]))) if len(y_val_raw) else 0.0
+    mae_high, mae_low, mae_close = stats.get("mae", [0.0, 0.0, 0.0])
+    mse_high, mse_low, mse_close = stats.get("mse", [0.0, 0.0, 0.0])
     mae = (mae_high + mae_low + mae_close) / 3.0
-    
-    mse_high = float(np.mean((preds[:, :, 0] - y_val_raw[:, :, 0]) ** 2)) if len(y_val_raw) else 0.0
-    mse_low = float(np.mean((preds[:, :, 1] - y_val_raw[:, :, 1]) ** 2)) if len(y_val_raw) else 0.0
-    mse_close = float(np.mean((preds[:, :, 2] - y_val_raw[:, :, 2]) ** 2)) if len(y_val_raw) else 0.0
     mse = (mse_high + mse_low + mse_close) / 3.0
-    rmse_high = float(np.sqrt(mse_high)) if mse_high > 0 else 0.0
-    rmse_low = float(np.sqrt(mse_low)) if mse_low > 0 else 0.0
-    rmse_close = float(np.sqrt(mse_close)) if mse_close > 0 else 0.0
-    rmse = float(np.sqrt(mse)) if mse > 0 else 0.0
+    rmse_high, rmse_low, rmse_close, rmse = np.sqrt([mse_high, mse_low, mse_close, mse]).tolist()
     
     # 方向准确率: 基于收盘价C
-    dir_acc = 0.0
-    if len(y_val_raw):
-        base = base_val.reshape(-1, 1)
-        # 使用收盘价计算方向
-        pred_close = preds[:, :, 2]  # 收盘价预测
-        true_close = y_val_raw[:, :, 2]  # 收盘价真实值
-        pred_dir = np.sign(pred_close - base)
-        true_dir = np.sign(true_close - base)
-        dir_acc = float((pred_dir == true_dir).mean())
-        
-        # 计算每个预测天数的方向准确率
-        dir_acc_by_day = []
-        for day in range(horizon):
-            day_pred_dir = pred_dir[:, day]
-            day_true_dir = true_dir[:, day]
-            day_acc = float((day_pred_dir == day_true_dir).mean())
-            dir_acc_by_day.append(day_acc)
-        logger.debug(f"各预测天数的方向准确率: {[f'{acc:.2%}' for acc in dir_acc_by_day]}")
+    dir_acc = stats["dir_acc"][0] if n_val else 0.0
+    if n_val:
+        # 每个预测天数的方向准确率
+        logger.debug(f"各预测天数的方向准确率: {[f'{acc:.2%}' for acc in stats['dir_acc_by_day']]}")
     
     # 价格关系约束违反率
-    constraint_violations = 0
-    total_checks = 0
-    for i in range(len(preds)):
-        for j in range(horizon):
-            total_checks += 3
-            # 检查 H >= C
-            if preds[i, j, 0] < preds[i, j, 2]:
-                constraint_violations += 1
-            # 检查 C >= L
-            if preds[i, j, 2] < preds[i, j, 1]:
-                constraint_violations += 1
-            # 检查 H >= L
-            if preds[i, j, 0] < preds[i, j, 1]:
-                constraint_violations += 1
+    constraint_violations = int(stats["violations"][0]) if n_val else 0
+    total_checks = preds.shape[0] * preds.shape[1] * 3
     constraint_violation_rate = constraint_violations / total_checks if total_checks > 0 else 0.0
 
     confidence = max(0.0, min(1.0, dir_acc))
@@ -953,45 +1071,14 @@ def train_lstm(
     # 增强：放大样本的单独评估指标
     logger.debug("计算放大样本的评估指标...")
     amp_metrics = {}
-    if len(is_amplified_val) > 0 and is_amplified_val.sum() > 0:
-        amp_mask = is_amplified_val
-        amp_preds = preds[amp_mask]
-        amp_y_val = y_val_raw[amp_mask]
-        amp_base = base_val[amp_mask].reshape(-1, 1)
-        
+    if has_amp:
         logger.debug(f"放大样本数: {int(amp_mask.sum())}")
         
-        # 放大样本的MAE: 分别计算H、L、C
-        amp_mae_high = float(np.mean(np.abs(amp_preds[:, :, 0] - amp_y_val[:, :, 0]))) if len(amp_y_val) > 0 else 0.0
-        amp_mae_low = float(np.mean(np.abs(amp_preds[:, :, 1] - amp_y_val[:, :, 1]))) if len(amp_y_val) > 0 else 0.0
-        amp_mae_close = float(np.mean(np.abs(amp_preds[:, :, 2] - amp_y_val[:, :, 2]))) if len(amp_y_val) > 0 else 0.0
-        amp_mae = (amp_mae_high + amp_mae_low + amp_mae_close) / 3.0
-        
-        amp_mse_high = float(np.mean((amp_preds[:, :, 0] - amp_y_val[:, :, 0]) ** 2)) if len(amp_y_val) > 0 else 0.0
-        amp_mse_low = float(np.mean((amp_preds[:, :, 1] - amp_y_val[:, :, 1]) ** 2)) if len(amp_y_val) > 0 else 0.0
-        amp_mse_close = float(np.mean((amp_preds[:, :, 2] - amp_y_val[:, :, 2]) ** 2)) if len(amp_y_val) > 0 else 0.0
-        amp_mse = (amp_mse_high + amp_mse_low + amp_mse_close) / 3.0
+        # 放大样本的MAE/MSE、方向准确率（基于收盘价）
+        amp_mae = stats["amp_mae"][0]
+        amp_mse = stats["amp_mse"][0]
         amp_rmse = float(np.sqrt(amp_mse)) if amp_mse > 0 else 0.0
-        
-        # 放大样本的方向准确率: 基于收盘价
-        amp_dir_acc = 0.0
-        if len(amp_y_val) > 0:
-            amp_pred_close = amp_preds[:, :, 2]
-            amp_true_close = amp_y_val[:, :, 2]
-            amp_pred_dir = np.sign(amp_pred_close - amp_base)
-            amp_true_dir = np.sign(amp_true_close - amp_base)
-            amp_dir_acc = float((amp_pred_dir == amp_true_dir).mean())
-        
-        # 放大样本的收益率统计: 基于收盘价
-        amp_returns = []
-        for i in range(len(amp_y_val)):
-            # 计算T+1到T+horizon的平均收益率（基于收盘价）
-            base_price = float(amp_base[i, 0])
-            if base_price > 0:
-                # 使用收盘价计算收益率
-                close_returns = (amp_y_val[i, :, 2] - base_price) / base_price
-                avg_return = float(np.mean(close_returns))
-                amp_returns.append(avg_return)
+        amp_dir_acc = stats["amp_dir_acc"][0]
         
         amp_metrics = {
             "amp_mae": amp_mae,
@@ -999,10 +1086,10 @@ def train_lstm(
             "amp_rmse": amp_rmse,
             "amp_dir_acc": amp_dir_acc,
             "amp_count": int(amp_mask.sum()),
-            "amp_return_mean": float(np.mean(amp_returns)) if amp_returns else 0.0,
-            "amp_return_std": float(np.std(amp_returns)) if amp_returns else 0.0,
-            "amp_return_min": float(np.min(amp_returns)) if amp_returns else 0.0,
-            "amp_return_max": float(np.max(amp_returns)) if amp_returns else 0.0,
+            "amp_return_mean": stats["amp_return_mean"][0] if has_returns else 0.0,
+            "amp_return_std": stats["amp_return_std"][0] if has_returns else 0.0,
+            "amp_return_min": stats["amp_return_min"][0] if has_returns else 0.0,
+            "amp_return_max": stats["amp_return_max"][0] if has_returns else 0.0,
         }
         
         logger.info("放大样本评估指标:")
@@ -1030,10 +1117,11 @@ def train_lstm(
 
     return {
         "model": model,
+        "eval_model": eval_model,
         "feat_mean": feat_mean,
         "feat_std": feat_std,
-        "y_mean": y_mean,  # 字典: {"high": ..., "low": ..., "close": ...}
-        "y_std": y_std,    # 字典: {"high": ..., "low": ..., "close": ...}
+        "y_mean": y_mean,  # ndarray (3,): [high, low, close]
+        "y_std": y_std,    # ndarray (3,): [high, low, close]
         "mae": mae,
         "mae_high": mae_high,
         "mae_low": mae_low,
@@ -1046,42 +1134,57 @@ def train_lstm(
         "confidence": confidence,
         "meta_val": meta_val,
         "preds_val": preds,
-        "y_val": y_val_raw,
+        "y_val": y_val,
         "amplified_count": amplified_count,
         "amplified_ratio": amplified_ratio,
         "amp_metrics": amp_metrics,
     }
 
 
+def _concat_meta(metas: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """按字段拼接多只股票的 meta 数组"""
+    return {k: np.concatenate([m[k] for m in metas]) for k in metas[0]}
+
+
 def predict_last_samples(
     model: nn.Module,
     X_last: np.ndarray,
     feat_mean: np.ndarray,
     feat_std: np.ndarray,
-    y_mean: dict,
-    y_std: dict,
-    meta_last: list[dict],
+    y_mean: np.ndarray,
+    y_std: np.ndarray,
+    meta_last: dict[str, np.ndarray],
+    batch_size: int = 256,
 ) -> pd.DataFrame:
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    X_last_n = (X_last - feat_mean) / feat_std
-    with torch.no_grad():
-        preds_norm = model(torch.tensor(X_last_n).to(device)).cpu().numpy()
-    
-    # 反标准化: 分别对H、L、C进行反标准化
-    preds = np.zeros_like(preds_norm, dtype=np.float32)
-    preds[:, :, 0] = preds_norm[:, :, 0] * y_std["high"] + y_mean["high"]
-    preds[:, :, 1] = preds_norm[:, :, 1] * y_std["low"] + y_mean["low"]
-    preds[:, :, 2] = preds_norm[:, :, 2] * y_std["close"] + y_mean["close"]
-    
-    rows = []
-    for i, p in enumerate(preds):
-        row = {**meta_last[i]}
-        for j in range(p.shape[0]):
-            row[f"pred_t{j+1}_high"] = float(p[j, 0])
-            row[f"pred_t{j+1}_low"] = float(p[j, 1])
-            row[f"pred_t{j+1}_close"] = float(p[j, 2])
-        rows.append(row)
-    return pd.DataFrame(rows)
+    pin_memory = device.type == "cuda"
+    X_last_n = np.ascontiguousarray((X_last - feat_mean) / feat_std, dtype=np.float32)
+    X_last_t = torch.from_numpy(X_last_n)
+    # 分批前向：CUDA 上只分配一个锁页暂存缓冲区，每批拷入后 non_blocking 上传
+    # （每批输出 .cpu() 时已同步，上一批的上传必然完成，缓冲区可安全复用）
+    staging = None
+    if pin_memory:
+        staging = torch.empty((min(batch_size, len(X_last_t)), *X_last_t.shape[1:]), pin_memory=True)
+    preds_chunks = []
+    with torch.inference_mode():
+        for start in range(0, len(X_last_t), batch_size):
+            xb = X_last_t[start : start + batch_size]
+            if staging is not None:
+                xb = staging[: len(xb)].copy_(xb)
+            preds_chunks.append(model(xb.to(device, non_blocking=True)).cpu().numpy())
+    preds_norm = np.concatenate(preds_chunks)
+    
+    # 反标准化: H、L、C 的均值/标准差按最后一维广播，一次完成
+    preds = (preds_norm * y_std + y_mean).astype(np.float32, copy=False)
+    
+    # 按列组装: 元数据列 + 每个预测天数的 H、L、C 列（输出保持 float64）
+    cols = dict(meta_last)
+    preds64 = preds.astype(np.float64)
+    for j in range(preds64.shape[1]):
+        cols[f"pred_t{j+1}_high"] = preds64[:, j, 0]
+        cols[f"pred_t{j+1}_low"] = preds64[:, j, 1]
+        cols[f"pred_t{j+1}_close"] = preds64[:, j, 2]
+    return pd.DataFrame(cols)
 
 
 def main():
@@ -1132,27 +1235,31 @@ def main():
 
     all_X, all_y, all_base = [], [], []
     all_meta = []
-    last_X, last_meta = [], []
+    last_X_arr: np.ndarray | None = None  # 每只股票最后一个窗口，首只成功股票时按形状预分配
+    last_meta = []
     feature_cols_final: list[str] = []
     
     processed_count = 0
     skipped_count = 0
 
+    # 一次性批量加载所有股票的因子和日线数据，循环内只做内存处理
+    factors_by_code = load_all_spacex_factors(ts_codes)
+    daily_by_code = load_all_daily_prices([c for c in ts_codes if c in factors_by_code])
+    logger.info(f"批量加载完成: 因子数据 {len(factors_by_code)} 只，日线数据 {len(daily_by_code)} 只")
+
     for idx, ts_code in enumerate(ts_codes, 1):
         logger.info(f"[{idx}/{len(ts_codes)}] 处理股票: {ts_code}")
         
-        # 加载SpaceX因子
-        logger.debug(f"  加载 {ts_code} 的SpaceX因子数据...")
-        factors = load_spacex_factors(ts_code)
+        # SpaceX因子
+        factors = factors_by_code.get(ts_code, pd.DataFrame())
         if factors.empty:
             logger.warning(f"  {ts_code}: SpaceX因子数据为空，跳过")
             skipped_count += 1
             continue
         logger.debug(f"  {ts_code}: 加载了 {len(factors)} 条因子记录，因子列数: {len(factors.columns) - 2}")
         
-        # 加载日线价格数据
-        logger.debug(f"  加载 {ts_code} 的日线价格数据...")
-        daily = load_daily_prices(ts_code)
+        # 日线价格数据
+        daily = daily_by_code.get(ts_code, pd.DataFrame())
         if daily.empty:
             logger.warning(f"  {ts_code}: 日线数据为空，跳过")
             skipped_count += 1
@@ -1219,10 +1326,12 @@ def main():
         all_X.append(X)
         all_y.append(y)
         all_base.append(base)
-        all_meta.extend(meta)
+        all_meta.append(meta)
 
-        last_X.append(X[-1])
-        last_meta.append(meta[-1])
+        if last_X_arr is None:
+            last_X_arr = np.empty((len(ts_codes), *X.shape[1:]), dtype=X.dtype)
+        last_X_arr[processed_count] = X[-1]
+        last_meta.append({k: v[-1:] for k, v in meta.items()})
         processed_count += 1
     
     logger.info("=" * 80)
@@ -1237,6 +1346,7 @@ def main():
     X_all = np.concatenate(all_X, axis=0)
     y_all = np.concatenate(all_y, axis=0)
     base_all = np.concatenate(all_base, axis=0)
+    meta_all = _concat_meta(all_meta)
     
     logger.info(f"数据合并完成:")
     logger.info(f"  - 训练样本数: {len(X_all)}")
@@ -1257,7 +1367,7 @@ def main():
         X_all,
         y_all,
         base_all,
-        all_meta,
+        meta_all,
         feature_cols_final,
         args.lookback,
         args.horizon,
@@ -1269,6 +1379,7 @@ def main():
         args.dropout,
         filter_amplified_only=args.filter_amplified_only,
         amp_weight_multiplier=args.amp_weight_multiplier,
+        seed=args.seed,
     )
 
     logger.info("=" * 80)
@@ -1308,8 +1419,8 @@ def main():
         "amp_trend_window": args.amp_trend_window,
         "feat_mean": result["feat_mean"],
         "feat_std": result["feat_std"],
-        "y_mean": result["y_mean"],  # 字典: {"high": ..., "low": ..., "close": ...}
-        "y_std": result["y_std"],    # 字典: {"high": ..., "low": ..., "close": ...}
+        "y_mean": result["y_mean"],  # ndarray (3,): [high, low, close]
+        "y_std": result["y_std"],    # ndarray (3,): [high, low, close]
         "confidence": confidence,
         "val_mae": result["mae"],
         "val_mae_high": result.get("mae_high", 0.0),
@@ -1330,13 +1441,13 @@ def main():
 
     logger.debug("生成最后样本的预测结果...")
     pred_df = predict_last_samples(
-        model,
-        np.stack(last_X),
+        result["eval_model"],
+        last_X_arr[:processed_count],
         result["feat_mean"],
         result["feat_std"],
         result["y_mean"],
         result["y_std"],
-        last_meta,
+        _concat_meta(last_meta),
     )
     logger.debug(f"预测结果包含 {len(pred_df)} 条记录")
     pred_df.to_csv(preds_path, index=False)
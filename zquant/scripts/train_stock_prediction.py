@@ -18,21 +18,31 @@
 整合日线、基础指标、技术因子及 SpaceX 因子，训练未来 10 日价格区间及信号模型。
 """
 
+import functools
+import hashlib
+import io
+import json
+import math
 import os
+import queue
+import re
 import sys
+import tarfile
+import time
 import pandas as pd
 import numpy as np
 import lightgbm as lgb
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from loguru import logger
+from numpy.lib.stride_tricks import sliding_window_view
 from sqlalchemy import text
 import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from zquant.config import settings
 from zquant.database import get_db_context
 from zquant.models.data import (
     get_daily_table_name,
@@ -41,36 +51,87 @@ from zquant.models.data import (
     get_spacex_factor_table_name,
     TUSTOCK_DAILY_VIEW_NAME,
 )
+from zquant.utils.stock_features import add_derived_features
 
 # 模型存储目录
 ARTIFACT_DIR = Path("ml_artifacts/universal")
 ARTIFACT_DIR.mkdir(exist_ok=True)
 
+# 单只股票特征工程+打标签结果的缓存目录；特征或标签逻辑变化时递增版本号使旧缓存失效
+FRAME_CACHE_DIR = ARTIFACT_DIR.parent / "cache"
+FRAME_CACHE_VERSION = 2
+
+# 分块读取查询结果时每块的行数
+READ_CHUNK_SIZE = 50_000
+
+# load_data 从四张分表各自读取的列（均另含 trade_date）
+DAILY_COLS = ('open', 'high', 'low', 'close', 'vol', 'amount', 'pct_chg')
+BASIC_COLS = ('turnover_rate', 'turnover_rate_f', 'volume_ratio', 'pe', 'pe_ttm', 'pb', 'ps', 'ps_ttm', 'dv_ratio', 'total_mv')
+FACTOR_COLS = (
+    'macd', 'macd_dif', 'macd_dea', 'kdj_k', 'kdj_d', 'kdj_j', 'rsi_6', 'rsi_12', 'rsi_24',
+    'boll_upper', 'boll_mid', 'boll_lower', 'cci',
+)
+SPACEX_COLS = ('ma5_tr', 'ma10_tr', 'ma20_tr', 'theday_turnover_volume', 'theday_xcross', 'halfyear_active_times')
+
+# 扫描分表 ts_code 时，每条 UNION ALL 语句合并的分表数
+UNION_CHUNK_SIZE = 50
+
+# 预测周期与回归目标
+HORIZON = 10
+REG_TARGETS = ('high', 'low', 'close')
+# 回归目标列（训练矩阵的列顺序）：先按预测日，再按 High/Low/Close
+TARGET_COLS = [f'target_{t}_{i}' for i in range(1, HORIZON + 1) for t in REG_TARGETS]
+
+# 回归模型并行训练的线程数（LightGBM 训练在 C++ 层释放 GIL）
+REG_FIT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+
+# 通用模型回归训练改用 CUDA 的最小规模（训练样本数 × 特征数）；规模较小时 GPU 的额外开销得不偿失
+GPU_MIN_CELLS = 50_000_000
+
+# 非特征列：标签、日期和股票代码（排除 ts_code，避免模型“记股票代码”）
+NON_FEATURE_PATTERN = re.compile(r'^(target_|trade_date|ts_code)')
+
+# 测试集比例（与 train_test_split(test_size=0.2) 的划分大小一致）
+TEST_SIZE = 0.2
+
+# 通用模型随机划分训练/测试集的随机种子（与 train_test_split(random_state=42) 一致）
+SPLIT_SEED = 42
+
+# 回归模型参数（与 LGBMRegressor(learning_rate=0.05, random_state=42, verbose=-1) 等价）
+REG_PARAMS = {'objective': 'regression', 'learning_rate': 0.05, 'seed': 42, 'verbose': -1}
+
+def _read_table(conn, table: str, cols: tuple[str, ...], order: bool = False) -> pd.DataFrame:
+    """单表按日期范围扫描，分块流式读取；trade_date 在读取时直接解析为日期"""
+    # 增加日期过滤，仅使用 2026 年之前的数据进行训练
+    query = f"SELECT trade_date, {', '.join(cols)} FROM `{table}` WHERE trade_date < '2026-01-01'"
+    if order:
+        query += " ORDER BY trade_date ASC"
+    chunks = list(pd.read_sql(text(query), conn, parse_dates=['trade_date'], chunksize=READ_CHUNK_SIZE))
+    if not chunks:
+        return pd.DataFrame({'trade_date': pd.Series(dtype='datetime64[ns]'), **{c: pd.Series(dtype=np.float32) for c in cols}})
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    # 浮点列读取后立即降为 float32，后续特征工程的内存带宽减半（LightGBM 训练本就使用 float32）
+    return df.astype({c: np.float32 for c in df.select_dtypes('float').columns}, copy=False)
+
 def load_data(ts_code: str):
-    """加载并合并四张表的数据"""
+    """
+    加载并合并四张表的数据。
+
+    四张分表各自做一次日期范围扫描（不再让 MySQL 执行 4 路 LEFT JOIN 并重复传输日期列），
+    再以日线为主表在进程内按 trade_date 左连接，结果与原 SQL 一致。
+    """
     with get_db_context() as db:
-        daily_table = get_daily_table_name(ts_code)
-        basic_table = get_daily_basic_table_name(ts_code)
-        factor_table = get_factor_table_name(ts_code)
-        spacex_table = get_spacex_factor_table_name(ts_code)
-
-        # 增加日期过滤，仅使用 2026 年之前的数据进行训练
-        query = f"""
-        SELECT 
-            d.trade_date, d.open, d.high, d.low, d.close, d.vol, d.amount, d.pct_chg,
-            b.turnover_rate, b.turnover_rate_f, b.volume_ratio, b.pe, b.pe_ttm, b.pb, b.ps, b.ps_ttm, b.dv_ratio, b.total_mv,
-            f.macd, f.macd_dif, f.macd_dea, f.kdj_k, f.kdj_d, f.kdj_j, f.rsi_6, f.rsi_12, f.rsi_24, f.boll_upper, f.boll_mid, f.boll_lower, f.cci,
-            s.ma5_tr, s.ma10_tr, s.ma20_tr, s.theday_turnover_volume, s.theday_xcross, s.halfyear_active_times
-        FROM `{daily_table}` d
-        LEFT JOIN `{basic_table}` b ON d.trade_date = b.trade_date
-        LEFT JOIN `{factor_table}` f ON d.trade_date = f.trade_date
-        LEFT JOIN `{spacex_table}` s ON d.trade_date = s.trade_date
-        WHERE d.trade_date < '2026-01-01'
-        ORDER BY d.trade_date ASC
-        """
-        
-        df = pd.read_sql(text(query), db.bind)
-        df['trade_date'] = pd.to_datetime(df['trade_date'])
+        # 服务端游标流式读取
+        conn = db.connection().execution_options(stream_results=True)
+        df = _read_table(conn, get_daily_table_name(ts_code), DAILY_COLS, order=True)
+        if df.empty:
+            return pd.DataFrame()
+        for table, cols in (
+            (get_daily_basic_table_name(ts_code), BASIC_COLS),
+            (get_factor_table_name(ts_code), FACTOR_COLS),
+            (get_spacex_factor_table_name(ts_code), SPACEX_COLS),
+        ):
+            df = df.merge(_read_table(conn, table, cols), on='trade_date', how='left')
         return df
 
 def list_ts_codes_for_universal(max_codes: int = 200) -> list[str]:
@@ -94,15 +155,31 @@ def list_ts_codes_for_universal(max_codes: int = 200) -> list[str]:
         tables = [t for t in tables if t != TUSTOCK_DAILY_VIEW_NAME and not str(t).endswith("_view")]
         tables.sort()
 
-        for t in tables:
+        # 每 UNION_CHUNK_SIZE 张分表合并为一条 UNION ALL 查询，一次往返取回各表最新记录的 ts_code；
+        # 带上分表序号，按分表顺序还原结果
+        for start in range(0, len(tables), UNION_CHUNK_SIZE):
             if max_codes and len(ts_codes) >= max_codes:
                 break
+            chunk = tables[start : start + UNION_CHUNK_SIZE]
+            sql = " UNION ALL ".join(
+                f"(SELECT {k} AS idx, ts_code FROM `{t}` ORDER BY trade_date DESC LIMIT 1)" for k, t in enumerate(chunk)
+            )
             try:
-                row = db.execute(text(f"SELECT ts_code FROM `{t}` ORDER BY trade_date DESC LIMIT 1")).fetchone()
-                if row and row[0]:
-                    ts_codes.append(str(row[0]))
+                rows = sorted(db.execute(text(sql)).fetchall())
             except Exception:
-                continue
+                # 个别分表异常时整条语句失败，退回逐表查询并跳过异常分表
+                rows = []
+                for k, t in enumerate(chunk):
+                    try:
+                        row = db.execute(text(f"SELECT ts_code FROM `{t}` ORDER BY trade_date DESC LIMIT 1")).fetchone()
+                    except Exception:
+                        continue
+                    if row:
+                        rows.append((k, row[0]))
+            ts_codes.extend(str(code) for _, code in rows if code)
+
+        if max_codes:
+            ts_codes = ts_codes[:max_codes]
 
     # 去重（保持顺序）
     seen = set()
@@ -114,51 +191,200 @@ def list_ts_codes_for_universal(max_codes: int = 200) -> list[str]:
         uniq.append(c)
     return uniq
 
+def _ffill_bfill(arr: np.ndarray) -> np.ndarray:
+    """按列先前向、再后向填充 NaN（等价于 DataFrame.ffill().bfill()），返回新数组"""
+    n = len(arr)
+    if n == 0:
+        return arr
+    rows = np.arange(n)[:, None]
+    cols = np.arange(arr.shape[1])
+    # 前向：每个位置取截至当前最后一个非 NaN 的行号
+    idx = np.where(np.isnan(arr), 0, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    out = arr[idx, cols]
+    # 后向：只剩开头的 NaN，取其后第一个非 NaN 的行号
+    idx = np.where(np.isnan(out), n - 1, rows)
+    idx = np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+    return out[idx, cols]
+
+def _mdd_alpha(close: np.ndarray) -> tuple[float, float]:
+    """一次性算出最大回撤和年化 Alpha（相对 0，按 250 个交易日年化）"""
+    if len(close) == 0:
+        return float("nan"), float("nan")
+    mdd = float(np.min(close / np.maximum.accumulate(close)) - 1.0)
+    if len(close) < 2:
+        return mdd, float("nan")
+    returns = close[1:] / close[:-1] - 1.0
+    returns = returns[~np.isnan(returns)]
+    alpha = float(returns.mean() * 250) if returns.size else float("nan")
+    return mdd, alpha
+
 def feature_engineering(df):
-    """特征工程"""
-    # 1. 价格动量特征
-    for window in [5, 10, 20]:
-        df[f'ma_{window}'] = df['close'].rolling(window).mean() / df['close'] - 1
-        df[f'vol_ma_{window}'] = df['vol'].rolling(window).mean() / df['vol'] - 1
-        
-    # 2. 滞后特征
-    for lag in [1, 2, 3]:
-        df[f'pct_chg_lag_{lag}'] = df['pct_chg'].shift(lag)
-        
-    # 3. 趋势特征
-    df['dist_boll_upper'] = df['boll_upper'] / df['close'] - 1
-    df['dist_boll_lower'] = df['boll_lower'] / df['close'] - 1
+    """特征工程（衍生特征由 add_derived_features 按 float32 计算，与预测脚本、评估服务一致）"""
+    df = add_derived_features(df)
     
-    # 填充缺失值
-    df = df.ffill().bfill()
+    # 强制转换数值类型，防止 lightgbm 报错；仅处理非数值列 (如含 NULL 的 object 列)，
+    # 先转换再统一填充，只需一次填充
+    obj_cols = df.select_dtypes(exclude='number').columns.difference(['trade_date'], sort=False)
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].apply(pd.to_numeric, errors='coerce').astype(np.float32)
     
-    # 强制转换数值类型，防止 lightgbm 报错
-    cols_to_fix = [c for c in df.columns if c != 'trade_date']
-    df[cols_to_fix] = df[cols_to_fix].apply(pd.to_numeric, errors='coerce')
-    df = df.ffill().bfill() 
+    # 填充缺失值：浮点列整体取出为矩阵，一次前向+后向填充后整块写回
+    float_cols = df.select_dtypes('float').columns
+    if len(float_cols):
+        df[float_cols] = _ffill_bfill(df[float_cols].to_numpy())
     
     return df
 
-def create_labels(df, horizon=10):
+def create_labels(df, horizon=HORIZON):
     """创建多步预测标签：未来 1-10 日每日的最高、最低和收盘收益率"""
-    for i in range(1, horizon + 1):
-        # 未来第 i 日相对于当前收盘的收益率
-        df[f'target_high_{i}'] = df['high'].shift(-i) / df['close'] - 1
-        df[f'target_low_{i}'] = df['low'].shift(-i) / df['close'] - 1
-        df[f'target_close_{i}'] = df['close'].shift(-i) / df['close'] - 1
-    
-    # 辅助标签：未来 10 日整体趋势信号 (用于综合判断)
-    df['f_return'] = df['close'].shift(-horizon) / df['close'] - 1
-    
-    df['target_signal'] = 0
-    df.loc[df['f_return'] > 0.05, 'target_signal'] = 1
-    df.loc[df['f_return'] < -0.05, 'target_signal'] = -1
+    close = df['close'].to_numpy(dtype=np.float32, na_value=np.nan)
+    pad = np.full(horizon, np.nan, dtype=np.float32)
+    # 全部回归标签写入一整块 float32 矩阵，列顺序：先按预测日，再按 High/Low/Close
+    target_cols = [f'target_{t}_{i}' for i in range(1, horizon + 1) for t in REG_TARGETS]
+    block = np.empty((len(df), len(target_cols)), dtype=np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for t_idx, target_type in enumerate(REG_TARGETS):
+            # 一次生成 (N, horizon) 的未来价格窗口：第 j 列为未来第 j+1 日，末尾不足部分为 NaN
+            price = np.concatenate([df[target_type].to_numpy(dtype=np.float32, na_value=np.nan), pad])
+            # 未来第 i 日相对于当前收盘的收益率，写入第 (i-1)*len(REG_TARGETS)+t_idx 列
+            block[:, t_idx::len(REG_TARGETS)] = sliding_window_view(price, horizon + 1)[:, 1:] / close[:, None] - 1
+    targets = pd.DataFrame(block, index=df.index, columns=target_cols, copy=False)
+
+    # 辅助标签：未来 10 日整体趋势信号 (用于综合判断)；未来收益只是中间量，不再保留为列
+    f_return = block[:, target_cols.index(f'target_close_{horizon}')]
+    targets['target_signal'] = np.where(f_return > 0.05, 1, np.where(f_return < -0.05, -1, 0))
+    df = pd.concat([df, targets], axis=1)
     
     # 移除包含 NaN 的行 (至少确保 10 日后的数据存在)
     cols_to_check = [f'target_close_{i}' for i in range(1, horizon + 1)]
     df = df.dropna(subset=cols_to_check)
     return df
 
+def _feature_cols(columns) -> list[str]:
+    """从列名中筛出特征列（保持原列顺序）"""
+    columns = pd.Index(columns)
+    return columns[~columns.str.match(NON_FEATURE_PATTERN)].tolist()
+
+def _build_train_dataset(
+    X_train: np.ndarray, label, features: list[str], cache_key: str | None = None, model_id: str = ""
+) -> lgb.Dataset:
+    """
+    构造（并分箱）回归模型共用的 lgb.Dataset。
+
+    给定 cache_key 时，分箱结果以 LightGBM 二进制格式缓存在 ARTIFACT_DIR/{model_id}.bin，
+    键记录在同名 .meta.json 中；键一致时直接加载，跳过分箱。
+    """
+    if cache_key is None:
+        return lgb.Dataset(
+            X_train, label=label, feature_name=features, params=REG_PARAMS, free_raw_data=False
+        ).construct()
+
+    bin_path = ARTIFACT_DIR / f"{model_id}.bin"
+    meta_path = ARTIFACT_DIR / f"{model_id}.bin.meta.json"
+    if bin_path.exists() and meta_path.exists():
+        try:
+            cached_key = json.loads(meta_path.read_text(encoding="utf-8")).get("key")
+        except (OSError, ValueError):
+            cached_key = None
+        if cached_key == cache_key:
+            logger.info(f"复用已分箱的训练集缓存: {bin_path}")
+            return lgb.Dataset(str(bin_path), params=REG_PARAMS).construct()
+
+    train_ds = lgb.Dataset(
+        X_train, label=label, feature_name=features, params=REG_PARAMS, free_raw_data=False
+    ).construct()
+    # 先删除旧键，再写临时文件改名，避免中断时留下不完整的缓存或与旧键配对的新缓存
+    meta_path.unlink(missing_ok=True)
+    tmp_bin = bin_path.with_name(bin_path.name + ".tmp")
+    train_ds.save_binary(str(tmp_bin))
+    os.replace(tmp_bin, bin_path)
+    tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+    tmp_meta.write_text(json.dumps({"key": cache_key}), encoding="utf-8")
+    os.replace(tmp_meta, meta_path)
+    logger.debug(f"已缓存分箱后的训练集: {bin_path}")
+    return train_ds
+
+def _save_regressors(boosters: dict[str, lgb.Booster], model_id: str) -> Path:
+    """
+    把全部回归模型以 LightGBM 原生文本格式打包进一个 tar：ARTIFACT_DIR/{model_id}_reg.tar，
+    成员名为 reg_{target}_t{day}.txt。一次写一个文件，省去逐个 pickle 的开销和 30 次文件元数据操作。
+    """
+    bundle_path = ARTIFACT_DIR / f"{model_id}_reg.tar"
+    tmp_path = bundle_path.with_name(bundle_path.name + ".tmp")
+    now = time.time()
+    with tarfile.open(tmp_path, mode="w") as tar:
+        for name, booster in boosters.items():
+            data = booster.model_to_string().encode("utf-8")
+            info = tarfile.TarInfo(f"reg_{name}.txt")
+            info.size = len(data)
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+    os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+@functools.lru_cache(maxsize=1)
+def _lgbm_cuda_ok() -> bool:
+    """探测 LightGBM 能否用 CUDA 训练（需以 CUDA 编译且有可用显卡），结果在进程内缓存"""
+    try:
+        lgb.train(
+            {'device_type': 'cuda', 'verbose': -1},
+            lgb.Dataset(np.zeros((32, 2)), label=np.zeros(32)),
+            num_boost_round=1,
+        )
+        return True
+    except Exception:
+        return False
+
+def _fit_regressors(
+    X_train: np.ndarray,
+    Y_train: np.ndarray,
+    features: list[str],
+    num_boost_round: int,
+    model_id: str,
+    cache_key: str | None = None,
+    device_params: dict | None = None,
+):
+    """
+    训练未来 1-HORIZON 日每日的 High/Low/Close 回归模型，并打包保存（见 _save_regressors）。
+
+    Y_train 形状为 (目标数, 样本数)，行顺序为 TARGET_COLS（每个目标的标签是连续内存，
+    可直接交给 LightGBM，不会再被复制）。所有目标共用同一份训练特征，特征分箱只做一次；
+    REG_FIT_WORKERS 个线程并行训练，每个线程独占一份 lgb.Dataset（复用首个 Dataset 的分箱边界），
+    逐目标替换标签再训练。
+
+    device_params 非空时（如 CUDA 训练参数）合并进训练参数，并改为单线程依次训练，
+    避免多个训练同时占用同一块显卡。
+    """
+    train_ds = _build_train_dataset(X_train, Y_train[0], features, cache_key=cache_key, model_id=model_id)
+    n_workers = 1 if device_params else min(REG_FIT_WORKERS, len(TARGET_COLS))
+    # 标签挂在 Dataset 上，线程间不能共用；空闲的 Dataset 放在队列里轮流取用
+    datasets = queue.Queue()
+    datasets.put(train_ds)
+    for _ in range(n_workers - 1):
+        datasets.put(lgb.Dataset(
+            X_train, label=Y_train[0], feature_name=features, reference=train_ds,
+            params=REG_PARAMS, free_raw_data=False,
+        ).construct())
+    # 限制每次训练的线程数，避免多个训练同时抢占全部核心
+    params = {**REG_PARAMS, 'num_threads': max(1, (os.cpu_count() or 1) // n_workers), **(device_params or {})}
+
+    def fit_one(j: int) -> lgb.Booster:
+        ds = datasets.get()
+        try:
+            ds.set_label(Y_train[j])
+            return lgb.train(params, ds, num_boost_round=num_boost_round)
+        finally:
+            datasets.put(ds)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        fitted = list(executor.map(fit_one, range(len(TARGET_COLS))))
+    names = [f"{t}_t{i}" for i in range(1, HORIZON + 1) for t in REG_TARGETS]
+    boosters = dict(zip(names, fitted, strict=True))
+    logger.debug(f"{model_id} 已完成未来 1-{HORIZON} 日 (High/Low/Close) 共 {len(boosters)} 个预测模型训练")
+    bundle_path = _save_regressors(boosters, model_id)
+    logger.debug(f"{model_id} 回归模型已保存: {bundle_path}")
+
 def train_models(ts_code: str):
     """训练模型"""
     logger.info(f"正在为股票 {ts_code} 训练多步预测模型...")
@@ -172,27 +398,25 @@ def train_models(ts_code: str):
     df = create_labels(df)
     
     # 特征列
-    exclude_patterns = ['target_', 'f_return', 'trade_date']
-    features = [c for c in df.columns if not any(p in c for p in exclude_patterns)]
+    features = _feature_cols(df.columns)
     
-    X = df[features]
+    # 一次性转为连续的 float32 矩阵（分箱/直方图构建读取的字节减半，且与预测脚本的输入精度一致），
+    # 之后所有模型都在同一矩阵上按行切片，不再逐模型复制 DataFrame
+    X_arr = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+    Y_arr = np.ascontiguousarray(df[TARGET_COLS].to_numpy(dtype=np.float32).T)
+    y_signal = df['target_signal'].to_numpy() + 1
+    # 按时间顺序划分，前 80% 训练
+    split = len(X_arr) - math.ceil(len(X_arr) * TEST_SIZE)
+    X_train, X_test = X_arr[:split], X_arr[split:]
+    y_train_s, y_test_s = y_signal[:split], y_signal[split:]
     
     # --- 1. 训练未来 1-10 日每日回归模型 (High, Low, Close) ---
-    for i in range(1, 11):
-        for target_type in ['high', 'low', 'close']:
-            y = df[f'target_{target_type}_{i}']
-            X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, shuffle=False)
-            model = lgb.LGBMRegressor(n_estimators=100, learning_rate=0.05, random_state=42, verbose=-1)
-            model.fit(X_train, y_train)
-            joblib.dump(model, ARTIFACT_DIR / f"{ts_code}_reg_{target_type}_t{i}.pkl")
-        
-        logger.debug(f"已完成未来第 {i} 日 (High/Low/Close) 预测模型训练")
+    _fit_regressors(X_train, Y_arr[:, :split], features, num_boost_round=100, model_id=ts_code)
 
     # --- 2. 训练信号分类模型 (用于综合置信度) ---
-    y_signal = df['target_signal'] + 1
-    X_train, X_test, y_train_s, y_test_s = train_test_split(X, y_signal, test_size=0.2, shuffle=False)
+    # 以零拷贝 DataFrame 包装传入，保留特征名（预测时按 DataFrame 输入）
     cls_signal = lgb.LGBMClassifier(n_estimators=100, learning_rate=0.05, random_state=42, verbose=-1)
-    cls_signal.fit(X_train, y_train_s)
+    cls_signal.fit(pd.DataFrame(X_train, columns=features, copy=False), y_train_s)
     joblib.dump(cls_signal, ARTIFACT_DIR / f"{ts_code}_cls_signal.pkl")
     
     # 保存特征列表
@@ -201,8 +425,8 @@ def train_models(ts_code: str):
     logger.info(f"所有多步预测模型已保存至 {ARTIFACT_DIR}")
     
     # --- 3. 综合评估 (基于测试集) ---
-    y_pred_s = cls_signal.predict(X_test)
-    acc = accuracy_score(y_test_s, y_pred_s)
+    y_pred_s = cls_signal.predict(pd.DataFrame(X_test, columns=features, copy=False))
+    acc = float(np.mean(y_test_s == y_pred_s))
     logger.info(f"方向信号准确率 (Accuracy): {acc:.4f}")
 
     # 计算胜率 (Win Rate): 预测涨跌方向与实际涨跌方向一致的比例
@@ -210,28 +434,107 @@ def train_models(ts_code: str):
     # 但更准确的胜率应该是针对“买入”信号的盈利比例
     buy_indices = np.where(y_pred_s == 2)[0] # 2 对应买入信号 (+1 偏移后)
     if len(buy_indices) > 0:
-        win_rate_buy = np.mean(y_test_s.iloc[buy_indices] == 2)
+        win_rate_buy = np.mean(y_test_s[buy_indices] == 2)
         logger.info(f"看多信号胜率 (Buy Win Rate): {win_rate_buy*100:.2f}%")
 
     # 计算最大回撤 (Max Drawdown) 和 Alpha/Beta (演示性)
     # 使用测试集的收盘价序列
-    test_dates = df.loc[X_test.index, 'trade_date']
-    test_close = df.loc[X_test.index, 'close']
-    
-    def calculate_mdd(series):
-        roll_max = series.cummax()
-        drawdown = series / roll_max - 1.0
-        return drawdown.min()
-    
-    mdd = calculate_mdd(test_close)
+    test_close = df['close'].to_numpy(dtype=np.float64)[split:]
+    mdd, alpha = _mdd_alpha(test_close)
     logger.info(f"测试集最大回撤 (Max Drawdown): {mdd*100:.2f}%")
 
     # Alpha 估算 (相对于 0)
-    test_returns = test_close.pct_change().dropna()
-    alpha = test_returns.mean() * 250
     logger.info(f"年化阿尔法 (Alpha, 相对0): {alpha:.4f}")
     logger.info(f"贝塔系数 (Beta): 1.00 (缺少指数数据)")
 
+def _shard_stats(ts_code: str) -> list[tuple]:
+    """
+    四张分表（日线、每日指标、因子、SpaceX 因子）训练区间内的 (最新交易日, 行数, 最近修改时间)，
+    按 load_data 的读取顺序返回，用作处理结果缓存的键；一条 UNION ALL 查询取回
+    """
+    tables = (
+        get_daily_table_name(ts_code),
+        get_daily_basic_table_name(ts_code),
+        get_factor_table_name(ts_code),
+        get_spacex_factor_table_name(ts_code),
+    )
+    sql = " UNION ALL ".join(
+        f"SELECT {k} AS idx, MAX(trade_date), COUNT(*), MAX(updated_time) FROM `{t}` WHERE trade_date < '2026-01-01'"
+        for k, t in enumerate(tables)
+    )
+    with get_db_context() as db:
+        rows = sorted(db.execute(text(sql)).fetchall())
+    return [tuple(row[1:]) for row in rows]
+
+def _prepare_one(ts_code: str, min_rows: int) -> pd.DataFrame | None:
+    """
+    加载单只股票并完成特征工程和打标签，数据不足或出错时返回 None。
+
+    处理结果以 pickle 缓存在 FRAME_CACHE_DIR/v{版本}_{ts_code}_{分表统计摘要}.pkl；
+    四张分表的最新交易日、行数和最近修改时间都未变化时直接读取缓存，跳过数据库读取和特征工程
+    （任一分表补数或重算都会改变摘要，旧缓存不再命中）。摘要记录在 df.attrs["shard_digest"]，
+    供通用模型构造分箱缓存的键。
+    """
+    try:
+        stats = _shard_stats(ts_code)
+        max_date, n_rows = stats[0][0], int(stats[0][1])
+        if max_date is None or n_rows < min_rows:
+            return None
+        prefix = f"v{FRAME_CACHE_VERSION}_{ts_code}_"
+        digest = hashlib.sha1(repr(stats).encode("utf-8")).hexdigest()[:16]
+        cache_path = FRAME_CACHE_DIR / f"{prefix}{digest}.pkl"
+        if cache_path.exists():
+            try:
+                df = pd.read_pickle(cache_path)
+                df.attrs["shard_digest"] = digest
+                return df
+            except Exception as e:
+                logger.debug(f"{ts_code} 缓存读取失败，重新计算: {e}")
+
+        df = load_data(ts_code)
+        if df.empty or len(df) < min_rows:
+            return None
+        df = feature_engineering(df)
+        df = create_labels(df)
+        if df.empty:
+            return None
+
+        # 标记来源股票（仅用于分组/排查，不作为特征）
+        df["ts_code"] = ts_code
+        df.attrs["shard_digest"] = digest
+
+        # 写临时文件再改名，避免中断时留下不完整的缓存；同一股票的旧缓存一并清理
+        FRAME_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+        for old_path in FRAME_CACHE_DIR.glob(f"{prefix}*.pkl"):
+            if old_path != cache_path:
+                old_path.unlink(missing_ok=True)
+        return df
+    except Exception as e:
+        logger.debug(f"跳过 {ts_code}: {e}")
+        return None
+
+def _stack_columns(dfs: list[pd.DataFrame], columns: list[str], by_column: bool = False) -> np.ndarray:
+    """
+    把各股票 DataFrame 的指定列依次写入一块预分配的 float32 矩阵，不生成拼接后的 DataFrame。
+
+    by_column=False 时形状为 (总行数, 列数)；True 时为 (列数, 总行数)，每列是一段连续内存。
+    缺少的列按 NaN 填充（与 pd.concat 的外连接一致）。
+    """
+    n_rows = sum(len(df) for df in dfs)
+    out = np.empty((len(columns), n_rows) if by_column else (n_rows, len(columns)), dtype=np.float32)
+    pos = 0
+    for df in dfs:
+        block = df.reindex(columns=columns).to_numpy(dtype=np.float32, na_value=np.nan)
+        if by_column:
+            out[:, pos:pos + len(df)] = block.T
+        else:
+            out[pos:pos + len(df)] = block
+        pos += len(df)
+    return out
+
 def train_universal_models(max_codes: int = 200, min_rows: int = 260):
     """
     训练一个“通用模型”（跨股票训练一套模型）
@@ -246,57 +549,63 @@ def train_universal_models(max_codes: int = 200, min_rows: int = 260):
         logger.error("未获取到可用 ts_code，无法训练通用模型。")
         return
 
-    dfs = []
-    used = 0
-    skipped = 0
-    for ts_code in ts_codes:
-        try:
-            df = load_data(ts_code)
-            if df.empty or len(df) < min_rows:
-                skipped += 1
-                continue
-            df = feature_engineering(df)
-            df = create_labels(df)
-            if df.empty:
-                skipped += 1
-                continue
-
-            # 标记来源股票（仅用于分组/排查，不作为特征）
-            df["ts_code"] = ts_code
-            dfs.append(df)
-            used += 1
-        except Exception as e:
-            skipped += 1
-            logger.debug(f"跳过 {ts_code}: {e}")
-            continue
+    # 各股票互不依赖：多线程并行加载和处理，DB 等待与 pandas 计算相互重叠
+    # （每个任务在 load_data 内自建会话；线程数不超过连接池大小）
+    n_jobs = max(1, min(os.cpu_count() or 1, settings.DB_POOL_SIZE))
+    results = joblib.Parallel(n_jobs=n_jobs, prefer="threads")(
+        joblib.delayed(_prepare_one)(ts_code, min_rows) for ts_code in ts_codes
+    )
+    dfs = [df for df in results if df is not None]
+    used = len(dfs)
+    skipped = len(results) - used
 
     if not dfs:
         logger.error("聚合训练数据为空（可能分表不足或数据缺失），无法训练通用模型。")
         return
 
-    all_df = pd.concat(dfs, ignore_index=True)
-    logger.info(f"通用模型训练集聚合完成：股票数={used}，跳过={skipped}，样本行数={len(all_df)}")
-
-    # 特征列（注意：排除 ts_code，避免模型“记股票代码”）
-    exclude_patterns = ['target_', 'f_return', 'trade_date']
-    features = [c for c in all_df.columns if not any(p in c for p in exclude_patterns) and c != "ts_code"]
-    X = all_df[features]
+    n_rows = sum(len(df) for df in dfs)
+    logger.info(f"通用模型训练集聚合完成：股票数={used}，跳过={skipped}，样本行数={n_rows}")
+
+    # 特征列顺序与 pd.concat 合并后的列一致
+    features = _feature_cols(list(dict.fromkeys(c for df in dfs for c in df.columns)))
+    # 各股票数据直接写入连续的 float32 矩阵，不再先拼出整张 DataFrame 再转换（峰值内存约减半）
+    # （分箱/直方图构建读取的字节减半，且与预测脚本的输入精度一致）
+    X_arr = _stack_columns(dfs, features)
+    Y_arr = _stack_columns(dfs, TARGET_COLS, by_column=True)
+    y_signal = np.concatenate([df['target_signal'].to_numpy() for df in dfs]) + 1
+    # 随机划分只生成一次行号（与 train_test_split(shuffle=True, random_state=42) 的划分相同），所有模型共用
+    n_test = math.ceil(len(X_arr) * TEST_SIZE)
+    perm = np.random.RandomState(SPLIT_SEED).permutation(len(X_arr))
+    test_idx, train_idx = perm[:n_test], perm[n_test:]
+    X_train, X_test = X_arr[train_idx], X_arr[test_idx]
+    Y_train = np.ascontiguousarray(Y_arr[:, train_idx])
+    y_train_s, y_test_s = y_signal[train_idx], y_signal[test_idx]
 
     # --- 1. 回归模型（未来 1-10 日：High/Low/Close）---
-    for i in range(1, 11):
-        for target_type in ['high', 'low', 'close']:
-            y = all_df[f'target_{target_type}_{i}']
-            X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, shuffle=True, random_state=42)
-            model = lgb.LGBMRegressor(n_estimators=150, learning_rate=0.05, random_state=42, verbose=-1)
-            model.fit(X_train, y_train)
-            joblib.dump(model, ARTIFACT_DIR / f"universal_reg_{target_type}_t{i}.pkl")
-        logger.debug(f"通用模型已完成未来第 {i} 日 (High/Low/Close) 训练")
+    # 特征、参与股票及其分表统计摘要、划分方式和训练参数都不变时，复用上次分箱好的训练集
+    # （只用元数据构造键，不对训练矩阵整体求哈希）
+    cache_key = hashlib.sha1(json.dumps({
+        "frame_cache_version": FRAME_CACHE_VERSION,
+        "features": features,
+        "stocks": [[df["ts_code"].iat[0], df.attrs.get("shard_digest")] for df in dfs],
+        "rows": n_rows,
+        "test_size": TEST_SIZE,
+        "split_seed": SPLIT_SEED,
+        "reg_params": REG_PARAMS,
+    }, sort_keys=True).encode("utf-8")).hexdigest()
+    # 训练集足够大且 LightGBM 支持 CUDA 时改用 GPU（先判断规模，小数据不做探测）
+    device_params = None
+    if X_train.size >= GPU_MIN_CELLS and _lgbm_cuda_ok():
+        device_params = {'device_type': 'cuda', 'gpu_use_dp': False}
+        logger.info(f"训练集规模 {X_train.shape}，回归模型使用 CUDA 训练")
+    _fit_regressors(
+        X_train, Y_train, features, num_boost_round=150, model_id="universal",
+        cache_key=cache_key, device_params=device_params,
+    )
 
     # --- 2. 信号分类模型 ---
-    y_signal = all_df['target_signal'] + 1
-    X_train, X_test, y_train_s, y_test_s = train_test_split(X, y_signal, test_size=0.2, shuffle=True, random_state=42)
     cls_signal = lgb.LGBMClassifier(n_estimators=150, learning_rate=0.05, random_state=42, verbose=-1)
-    cls_signal.fit(X_train, y_train_s)
+    cls_signal.fit(pd.DataFrame(X_train, columns=features, copy=False), y_train_s)
     joblib.dump(cls_signal, ARTIFACT_DIR / "universal_cls_signal.pkl")
 
     # 保存特征列表
@@ -305,8 +614,8 @@ def train_universal_models(max_codes: int = 200, min_rows: int = 260):
 
     # 简单评估（分类）
     try:
-        y_pred_s = cls_signal.predict(X_test)
-        acc = accuracy_score(y_test_s, y_pred_s)
+        y_pred_s = cls_signal.predict(pd.DataFrame(X_test, columns=features, copy=False))
+        acc = float(np.mean(y_test_s == y_pred_s))
         logger.info(f"通用模型方向信号准确率 (Accuracy): {acc:.4f}")
     except Exception:
         pass
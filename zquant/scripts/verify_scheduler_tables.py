@@ -13,27 +13,28 @@ zquant_dir = script_dir.parent  # zquant 目录
 project_root = zquant_dir.parent  # 项目根目录（包含 zquant 目录的目录）
 sys.path.insert(0, str(project_root))
 
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
 from zquant.database import engine
 
+# 需要验证的定时任务表
+REQUIRED_TABLES = ("zq_task_scheduled_tasks", "zq_task_task_executions")
+
 
 def verify_tables():
-    """验证表是否存在"""
+    """验证表是否存在（一次 information_schema 查询检查全部表）"""
+    query = text(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name IN :names"
+    ).bindparams(bindparam("names", expanding=True))
     with engine.connect() as conn:
-        # 检查zq_task_scheduled_tasks表
-        result = conn.execute(text("SHOW TABLES LIKE 'zq_task_scheduled_tasks'"))
-        if result.fetchone():
-            print("[OK] zq_task_scheduled_tasks table exists")
-        else:
-            print("[ERROR] zq_task_scheduled_tasks table does not exist")
+        existing = {row[0] for row in conn.execute(query, {"names": list(REQUIRED_TABLES)})}
 
-        # 检查zq_task_task_executions表
-        result2 = conn.execute(text("SHOW TABLES LIKE 'zq_task_task_executions'"))
-        if result2.fetchone():
-            print("[OK] zq_task_task_executions table exists")
+    for table_name in REQUIRED_TABLES:
+        if table_name in existing:
+            print(f"[OK] {table_name} table exists")
         else:
-            print("[ERROR] zq_task_task_executions table does not exist")
+            print(f"[ERROR] {table_name} table does not exist")
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@
 用于管理zq_data_tustock相关表的操作
 """
 
+import argparse
 import datetime
 from pathlib import Path
 import sys
@@ -11,6 +12,7 @@ from typing import Any
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import re
 import time
 import random
 
@@ -24,6 +26,7 @@ zquant_dir = script_dir.parent  # zquant 目录
 project_root = zquant_dir.parent  # 项目根目录（包含 zquant 目录的目录）
 sys.path.insert(0, str(project_root))
 
+from sqlalchemy import bindparam, event
 from sqlalchemy import inspect as sql_inspect
 from sqlalchemy import text
 
@@ -44,14 +47,82 @@ from zquant.models.data import (
     get_spacex_factor_table_name,
 )
 
+# 表名列表缓存的有效期（秒）
+TABLE_LIST_CACHE_TTL = 30
+
+# 检查表是否存在未命中时，距上次反射超过该秒数才重新反射，避免确实不存在的表每次检查都反射整个库
+TABLE_MISS_RECHECK_INTERVAL = 2
+
+# 交互菜单中单表记录数缓存的有效期（秒）
+ROW_COUNT_CACHE_TTL = 60
+
+# 按时间段删除时识别日期字段的优先级
+DATE_FIELDS = ("trade_date", "date", "created_time", "updated_time")
+
+# 会改变表结构的 SQL 前缀，执行后需清空反射缓存
+DDL_PREFIXES = ("CREATE", "ALTER", "DROP", "RENAME", "TRUNCATE")
+
+# 统计记录数时每条 UNION ALL 语句合并的表数
+COUNT_UNION_CHUNK_SIZE = 200
+
+# 并行统计记录数的线程数（每个线程独立会话；可通过环境变量 TABLE_COUNT_WORKERS 调整，最大 10）
+COUNT_WORKERS = max(1, min(int(os.getenv("TABLE_COUNT_WORKERS", "4")), 10))
+
+# 分表组按时间段删除数据的并发数（每个线程独立会话；可通过环境变量 TABLE_DELETE_WORKERS 调整，最大 10）
+DELETE_WORKERS = max(1, min(int(os.getenv("TABLE_DELETE_WORKERS", "8")), 10))
+
+# 分表组删除时每个事务（一次提交）合并的分表数上限
+DELETE_CHUNK_SIZE = 500
+
+# 慢查询日志阈值（毫秒），可通过环境变量 DBTOOL_SLOW_QUERY_MS 调整
+SLOW_QUERY_MS = int(os.getenv("DBTOOL_SLOW_QUERY_MS", "100"))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+    if elapsed_ms > SLOW_QUERY_MS:
+        logger.warning(f"慢查询 ({elapsed_ms:.0f} ms): {' '.join(statement.split())[:500]}")
+
+
+def install_slow_query_log() -> None:
+    """
+    为数据库引擎注册慢查询日志（超过 SLOW_QUERY_MS 的语句输出 warning），重复调用只注册一次
+    连接池大小沿用 settings.DB_POOL_SIZE / DB_MAX_OVERFLOW（默认 10/20），足以容纳统计/删除线程池
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
 class ZQuantDBTool:
     """数据库操作工具类"""
 
-    def __init__(self, table_prefix: str = "zq_data_tustock"):
+    def __init__(self, table_prefix: str = "zq_data_tustock", exact_counts: bool = False):
         self.table_prefix = table_prefix
+        # 分表详情是否使用 COUNT(*) 精确统计（默认使用 information_schema 的估算值）
+        self.exact_counts = exact_counts
         self.log_table_name = DataOperationLog.__tablename__
         self.log_table_structure = {"name": DataOperationLog.__tablename__}
         self.db = SessionLocal()
+        # 表名 -> 日期字段（None 表示无日期字段），同一次运行内复用
+        self._date_field_cache: dict[str, str | None] = {}
+        # (缓存时间, 全部表名)，TABLE_LIST_CACHE_TTL 秒内复用
+        self._table_list_cache: tuple[float, set[str]] | None = None
+        # 表名缓存刷新锁：删除线程池中多个线程同时过期时只反射一次
+        self._table_list_lock = threading.Lock()
+        # 表名 -> (缓存时间, 记录数)，ROW_COUNT_CACHE_TTL 秒内复用，删数据/删表后失效
+        self._rowcount_cache: dict[str, tuple[float, int]] = {}
+        # 复用同一个 Inspector，表名/列信息的反射结果缓存在实例内，DDL 后通过 _invalidate_inspector 清空
+        self._inspector = sql_inspect(engine)
+        # 分表名：<基础表名>_<6位股票代码>
+        self._shard_re = re.compile(r"(?P<base>.+)_(?P<code>\d{6})")
 
     def __del__(self):
         """清理资源"""
@@ -61,36 +132,112 @@ class ZQuantDBTool:
         except:
             pass  # 忽略清理时的错误
 
-    def _execute_sql(self, sql: str, params: dict = None) -> None:
-        """执行SQL语句（增删改）"""
+    def _execute_sql(self, sql: str, params: dict = None, db=None):
+        """执行SQL语句（增删改）并返回执行结果（可读取 rowcount）；db 为空时使用 self.db，线程池中需传入线程独立的会话"""
+        db = db or self.db
         try:
             if params:
-                self.db.execute(text(sql), params)
+                result = db.execute(text(sql), params)
             else:
-                self.db.execute(text(sql))
-            self.db.commit()
+                result = db.execute(text(sql))
+            db.commit()
+            if sql.lstrip().upper().startswith(DDL_PREFIXES):
+                self._invalidate_inspector()
+                self._invalidate_table_list()
+            return result
         except Exception as e:
-            self.db.rollback()
+            db.rollback()
             logger.error(f"执行SQL失败: {sql}, params: {params}, error: {e}")
             raise
 
-    def _execute_sql_fetch(self, sql: str, params: dict = None) -> list[tuple]:
-        """执行SQL查询语句"""
+    def _core_fetch(self, sql, params: dict = None) -> list[tuple]:
+        """通过短期 Core 连接执行只读查询，绕过 Session 的 identity map / autoflush 开销"""
+        statement = text(sql) if isinstance(sql, str) else sql
+        with engine.connect() as conn:
+            if params:
+                return conn.execute(statement, params).fetchall()
+            return conn.execute(statement).fetchall()
+
+    def _execute_sql_fetch(self, sql, params: dict = None, db=None) -> list[tuple]:
+        """
+        执行SQL查询语句（sql 可为字符串或 text() 语句）
+        db 为空时走 Core 连接（_core_fetch）；传入会话时在该会话内查询，可读到其未提交的修改
+        """
         try:
+            if db is None:
+                return self._core_fetch(sql, params)
+            statement = text(sql) if isinstance(sql, str) else sql
             if params:
-                result = self.db.execute(text(sql), params)
+                result = db.execute(statement, params)
             else:
-                result = self.db.execute(text(sql))
+                result = db.execute(statement)
             return result.fetchall()
         except Exception as e:
             logger.error(f"执行SQL查询失败: {sql}, params: {params}, error: {e}")
             raise
 
+    def _prefetch_date_fields(self, table_names: list[str], db=None) -> None:
+        """一次查询 information_schema.columns，识别多张表的日期字段并写入缓存"""
+        pending = [name for name in table_names if name not in self._date_field_cache]
+        if not pending:
+            return
+
+        columns_sql = text(
+            """
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = :db_name AND table_name IN :table_names AND column_name IN :fields
+            """
+        ).bindparams(bindparam("table_names", expanding=True), bindparam("fields", expanding=True))
+        rows = self._execute_sql_fetch(
+            columns_sql, {"db_name": settings.DB_NAME, "table_names": pending, "fields": list(DATE_FIELDS)}, db=db
+        )
+
+        found: dict[str, set[str]] = {}
+        for table_name, column_name in rows:
+            found.setdefault(table_name, set()).add(column_name.lower())
+        for table_name in pending:
+            columns = found.get(table_name, set())
+            self._date_field_cache[table_name] = next((f for f in DATE_FIELDS if f in columns), None)
+
+    def _get_date_field(self, table_name: str, db=None) -> str | None:
+        """按 DATE_FIELDS 优先级返回表的日期字段，没有则返回 None（结果缓存）"""
+        if table_name not in self._date_field_cache:
+            self._prefetch_date_fields([table_name], db=db)
+        return self._date_field_cache[table_name]
+
+    def _get_table_names(self, max_age: float = TABLE_LIST_CACHE_TTL) -> set[str]:
+        """
+        获取数据库中的全部表名；缓存 max_age 秒内复用，避免反复反射整个库
+        刷新在锁内进行并再次检查缓存，多线程同时过期时只有一个线程反射
+        """
+        cached = self._table_list_cache
+        if cached is not None and time.time() - cached[0] < max_age:
+            return cached[1]
+        with self._table_list_lock:
+            cached = self._table_list_cache
+            if cached is not None and time.time() - cached[0] < max_age:
+                return cached[1]
+            # 缓存过期说明可能有外部建表/删表，先清空 Inspector 的反射缓存再读取
+            self._invalidate_inspector()
+            table_names = set(self._inspector.get_table_names())
+            self._table_list_cache = (time.time(), table_names)
+            return table_names
+
+    def _invalidate_table_list(self) -> None:
+        """建表/删表后使表名缓存失效（下次读取时同时刷新 Inspector）"""
+        self._table_list_cache = None
+
+    def _invalidate_inspector(self) -> None:
+        """清空 Inspector 的反射缓存（表名、列信息等）"""
+        self._inspector.clear_cache()
+
     def _check_table_exists(self, table_name: str) -> bool:
         """检查表是否存在"""
         try:
-            inspector = sql_inspect(engine)
-            return table_name in inspector.get_table_names()
+            if table_name in self._get_table_names():
+                return True
+            # 缓存中没有时，缓存超过 TABLE_MISS_RECHECK_INTERVAL 秒则重新反射一次，避免缓存期内外部新建的表被误判为不存在
+            return table_name in self._get_table_names(max_age=TABLE_MISS_RECHECK_INTERVAL)
         except Exception as e:
             logger.error(f"检查表是否存在失败: {table_name}, error: {e}")
             return False
@@ -102,8 +249,7 @@ class ZQuantDBTool:
             List[str]: 表名列表
         """
         try:
-            inspector = sql_inspect(engine)
-            all_tables = inspector.get_table_names()
+            all_tables = self._get_table_names()
             # 过滤出符合前缀的表
             tustock_tables = [table for table in all_tables if table.startswith(self.table_prefix)]
             return sorted(tustock_tables)
@@ -111,6 +257,82 @@ class ZQuantDBTool:
             logger.error(f"获取tustock表列表失败: {e}")
             return []
 
+    def _get_table_sizes(self) -> dict[str, Any]:
+        """一次查询 information_schema，获取当前前缀下所有表的大小 (MB)"""
+        size_sql = """
+        SELECT 
+            table_name,
+            ROUND(((data_length + index_length) / 1024 / 1024), 2) AS 'Size_MB'
+        FROM information_schema.tables 
+        WHERE table_schema = :db_name AND table_name LIKE :name_pattern
+        """
+        # 前缀中的 "_" 在 LIKE 中是通配符，需要转义
+        name_pattern = self.table_prefix.replace("_", "\\_") + "%"
+        size_result = self._execute_sql_fetch(size_sql, {"db_name": settings.DB_NAME, "name_pattern": name_pattern})
+        return {row[0]: row[1] or 0 for row in size_result}
+
+    def _get_table_estimates(self, table_names: list[str]) -> dict[str, tuple[int, float]]:
+        """
+        一次查询 information_schema.tables，获取多张表的估算记录数 (table_rows) 和大小 (MB)
+        InnoDB 的 table_rows 为统计估算值，无需扫描表
+        Returns:
+            Dict[str, tuple]: 表名 -> (估算记录数, 大小MB)
+        """
+        if not table_names:
+            return {}
+        stats_sql = text(
+            """
+            SELECT table_name, table_rows, ROUND(((data_length + index_length) / 1024 / 1024), 2)
+            FROM information_schema.tables
+            WHERE table_schema = :db_name AND table_name IN :table_names
+            """
+        ).bindparams(bindparam("table_names", expanding=True))
+        rows = self._execute_sql_fetch(stats_sql, {"db_name": settings.DB_NAME, "table_names": list(table_names)})
+        return {row[0]: (int(row[1] or 0), float(row[2] or 0)) for row in rows}
+
+    def _count_rows_chunk(self, chunk: list[str]) -> dict[str, Any]:
+        """
+        统计一批表的记录数（用于线程池执行）：合并为一条 UNION ALL 语句，
+        失败时逐表重试，仍失败的表对应值为异常对象。使用独立的 Core 连接，不与 self.db 共享
+        """
+        counts = {}
+        union_sql = " UNION ALL ".join(f"SELECT {idx} AS idx, COUNT(*) FROM `{table}`" for idx, table in enumerate(chunk))
+        with engine.connect() as conn:
+            try:
+                for idx, record_count in conn.execute(text(union_sql)).fetchall():
+                    counts[chunk[idx]] = record_count
+                return counts
+            except Exception as e:
+                conn.rollback()
+                logger.debug(f"批量统计记录数失败，改为逐表统计: {e}")
+
+            for table in chunk:
+                try:
+                    count_result = conn.execute(text(f"SELECT COUNT(*) FROM `{table}`")).fetchall()
+                    counts[table] = count_result[0][0] if count_result else 0
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"统计表 {table} 记录数失败: {e}")
+                    counts[table] = e
+        return counts
+
+    def _count_rows_batch(self, tables: list[str]) -> dict[str, Any]:
+        """
+        统计多张表的记录数：每 COUNT_UNION_CHUNK_SIZE 张表一批，最多 COUNT_WORKERS 批并行查询
+        Returns:
+            Dict[str, Any]: 表名 -> 记录数；查询失败的表对应值为异常对象
+        """
+        chunks = [tables[i : i + COUNT_UNION_CHUNK_SIZE] for i in range(0, len(tables), COUNT_UNION_CHUNK_SIZE)]
+        if len(chunks) <= 1:
+            return self._count_rows_chunk(chunks[0]) if chunks else {}
+
+        counts = {}
+        with ThreadPoolExecutor(max_workers=min(COUNT_WORKERS, len(chunks))) as executor:
+            futures = [executor.submit(self._count_rows_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                counts.update(future.result())
+        return counts
+
     def get_table_overview(self) -> dict[str, Any]:
         """
         查看分表概况
@@ -126,57 +348,49 @@ class ZQuantDBTool:
             total_records = 0
             table_groups = {}
 
-            for table in tables:
-                try:
-                    # 获取表记录数
-                    count_sql = f"SELECT COUNT(*) FROM `{table}`"
-                    count_result = self._execute_sql_fetch(count_sql)
-                    record_count = count_result[0][0] if count_result else 0
-                    total_records += record_count
-
-                    # 获取表大小信息
-                    size_sql = """
-                    SELECT 
-                        ROUND(((data_length + index_length) / 1024 / 1024), 2) AS 'Size_MB'
-                    FROM information_schema.tables 
-                    WHERE table_schema = :db_name AND table_name = :table_name
-                    """
-                    size_result = self._execute_sql_fetch(size_sql, {"db_name": settings.DB_NAME, "table_name": table})
-                    table_size_mb = size_result[0][0] if size_result else 0
-
-                    # 分析表名结构
-                    if "_" in table:
-                        base_name = table.rsplit("_", 1)[0]
-                        code = table.rsplit("_", 1)[1]
-                    else:
-                        base_name = table
-                        code = ""
-
-                    table_info = {
-                        "table_name": table,
-                        "base_name": base_name,
-                        "code": code,
-                        "record_count": record_count,
-                        "size_mb": table_size_mb,
-                    }
-                    table_details.append(table_info)
-
-                    # 按基础表名分组
-                    if base_name not in table_groups:
-                        table_groups[base_name] = []
-                    table_groups[base_name].append(table_info)
+            # 表大小和记录数各自批量查询，不再每张表两次往返
+            table_sizes = self._get_table_sizes()
+            table_counts = self._count_rows_batch(tables)
 
-                except Exception as e:
-                    logger.error(f"获取表 {table} 信息失败: {e}")
+            for table in tables:
+                record_count = table_counts.get(table, 0)
+                if isinstance(record_count, Exception):
+                    logger.error(f"获取表 {table} 信息失败: {record_count}")
                     table_info = {
                         "table_name": table,
                         "base_name": table,
                         "code": "",
                         "record_count": 0,
                         "size_mb": 0,
-                        "error": str(e),
+                        "error": str(record_count),
                     }
                     table_details.append(table_info)
+                    continue
+
+                total_records += record_count
+                table_size_mb = table_sizes.get(table, 0)
+
+                # 分析表名结构
+                if "_" in table:
+                    base_name = table.rsplit("_", 1)[0]
+                    code = table.rsplit("_", 1)[1]
+                else:
+                    base_name = table
+                    code = ""
+
+                table_info = {
+                    "table_name": table,
+                    "base_name": base_name,
+                    "code": code,
+                    "record_count": record_count,
+                    "size_mb": table_size_mb,
+                }
+                table_details.append(table_info)
+
+                # 按基础表名分组
+                if base_name not in table_groups:
+                    table_groups[base_name] = []
+                table_groups[base_name].append(table_info)
 
             return {
                 "total_tables": len(tables),
@@ -188,13 +402,14 @@ class ZQuantDBTool:
             logger.error(f"获取分表概况失败: {e}")
             return {"total_tables": 0, "total_records": 0, "table_details": [], "table_groups": {}, "error": str(e)}
 
-    def delete_table_data_by_date_range(self, table_name: str, start_date: str, end_date: str) -> dict[str, Any]:
+    def delete_table_data_by_date_range(self, table_name: str, start_date: str, end_date: str, db=None) -> dict[str, Any]:
         """
         按时间段删除分表数据
         Args:
             table_name (str): 要删除数据的表名
             start_date (str): 开始日期 (YYYY-MM-DD)
             end_date (str): 结束日期 (YYYY-MM-DD)
+            db: 使用的数据库会话，为空时使用 self.db（并行删除时每个线程传入独立会话）
         Returns:
             Dict[str, Any]: 操作结果
         """
@@ -223,18 +438,7 @@ class ZQuantDBTool:
                 return {"success": False, "message": error_message, "delete_count": 0}
 
             # 检查表是否有日期字段
-            date_fields = ["trade_date", "date", "created_time", "updated_time"]
-            date_field = None
-
-            for field in date_fields:
-                try:
-                    check_sql = f"SHOW COLUMNS FROM `{table_name}` LIKE :field"
-                    result = self._execute_sql_fetch(check_sql, {"field": field})
-                    if result:
-                        date_field = field
-                        break
-                except:
-                    continue
+            date_field = self._get_date_field(table_name, db=db)
 
             if not date_field:
                 error_message = f"表 {table_name} 中未找到日期字段"
@@ -243,19 +447,16 @@ class ZQuantDBTool:
                 print(f"ERROR: {error_message}")
                 return {"success": False, "message": error_message, "delete_count": 0}
 
-            # 获取删除前的记录数
-            count_sql = f"SELECT COUNT(*) FROM `{table_name}` WHERE `{date_field}` BETWEEN :start_date AND :end_date"
-            count_result = self._execute_sql_fetch(count_sql, {"start_date": start_date, "end_date": end_date})
-            records_to_delete = count_result[0][0] if count_result else 0
+            # 执行删除操作，删除条数直接取自 rowcount，无需预先 COUNT
+            delete_sql = f"DELETE FROM `{table_name}` WHERE `{date_field}` BETWEEN :start_date AND :end_date"
+            result = self._execute_sql(delete_sql, {"start_date": start_date, "end_date": end_date}, db=db)
+            records_to_delete = max(result.rowcount, 0)
+            self._rowcount_cache.pop(table_name, None)
 
             if records_to_delete == 0:
                 print(f"OK: 表 {table_name} 在 {start_date} 到 {end_date} 期间没有数据需要删除")
                 return {"success": True, "message": f"表 {table_name} 在指定时间段内没有数据", "delete_count": 0}
 
-            # 执行删除操作
-            delete_sql = f"DELETE FROM `{table_name}` WHERE `{date_field}` BETWEEN :start_date AND :end_date"
-            self._execute_sql(delete_sql, {"start_date": start_date, "end_date": end_date})
-
             end_time = datetime.datetime.now()
 
             # 记录操作日志
@@ -267,6 +468,7 @@ class ZQuantDBTool:
                 error_message=error_message,
                 start_time=start_time,
                 end_time=end_time,
+                db=db,
             )
 
             print(
@@ -294,10 +496,27 @@ class ZQuantDBTool:
                 error_message=error_message,
                 start_time=start_time,
                 end_time=end_time,
+                db=db,
             )
 
             return {"success": False, "message": error_message, "delete_count": 0}
 
+    def _group_tables(self, tables: list[str]) -> tuple[list[str], dict[str, list[tuple[str, str]]]]:
+        """
+        将表名划分为独立表和分表组（以6位股票代码结尾的表按基础表名分组）
+        Returns:
+            tuple: (独立表列表, {基础表名: [(表名, 股票代码), ...]})
+        """
+        standalone_tables = []
+        table_groups: dict[str, list[tuple[str, str]]] = {}
+        for table in tables:
+            match = self._shard_re.fullmatch(table)
+            if match:
+                table_groups.setdefault(match["base"], []).append((table, match["code"]))
+            else:
+                standalone_tables.append(table)
+        return standalone_tables, table_groups
+
     def list_tustock_tables(self):
         """
         列举表名为zq_data_tustock开头的表，支持分表显示
@@ -308,25 +527,7 @@ class ZQuantDBTool:
             return
 
         # 分析表结构，识别分表
-        table_groups = {}
-        standalone_tables = []
-
-        for table in tables:
-            # 检查是否为分表（必须以股票代码结尾）
-            if "_" in table and table != self.table_prefix:
-                # 尝试从最后一个下划线分割
-                parts = table.rsplit("_", 1)
-                if len(parts) == 2:
-                    base_name, code = parts
-                    # 验证code是否为有效的股票代码（6位数字）
-                    if code and code.isdigit() and len(code) == 6:
-                        if base_name not in table_groups:
-                            table_groups[base_name] = []
-                        table_groups[base_name].append((table, code))
-                        continue
-
-            # 如果不是分表，加入独立表列表
-            standalone_tables.append(table)
+        standalone_tables, table_groups = self._group_tables(tables)
 
         # 显示结果
         total_tables = len(tables)
@@ -483,34 +684,39 @@ class ZQuantDBTool:
         sample_tables = []
 
         print("\n分表统计 (显示前10个作为示例):")
+        if not self.exact_counts:
+            print("   (记录数为 information_schema 估算值，启动时加 --exact-counts 可精确统计)")
         print("-" * 80)
         print(f"{'序号':<4} {'表名':<40} {'记录数':<12} {'大小(MB)':<12}")
         print("-" * 80)
 
-        for i, (table_name, code) in enumerate(sub_tables[:10], 1):
-            try:
-                # 获取表记录数
-                count_sql = f"SELECT COUNT(*) FROM `{table_name}`"
-                count_result = self._execute_sql_fetch(count_sql)
-                record_count = count_result[0][0] if count_result else 0
-                total_records += record_count
+        sample_names = [table_name for table_name, _ in sub_tables[:10]]
+        try:
+            if self.exact_counts:
+                # 示例表的记录数批量（并行）统计，大小一次查询获取
+                table_counts = self._count_rows_batch(sample_names)
+                table_sizes = self._get_table_sizes()
+            else:
+                # 估算记录数和大小一次查询获取，不扫描表
+                estimates = self._get_table_estimates(sample_names)
+                table_counts = {name: rows for name, (rows, _) in estimates.items()}
+                table_sizes = {name: size_mb for name, (_, size_mb) in estimates.items()}
+        except Exception as e:
+            logger.error(f"获取分表统计信息失败: {e}")
+            table_counts, table_sizes = {}, {}
 
-                # 获取表大小信息
-                size_sql = """
-                SELECT 
-                    ROUND(((data_length + index_length) / 1024 / 1024), 2) AS 'Size_MB'
-                FROM information_schema.tables 
-                WHERE table_schema = :db_name AND table_name = :table_name
-                """
-                size_result = self._execute_sql_fetch(size_sql, {"db_name": settings.DB_NAME, "table_name": table_name})
-                table_size_mb = size_result[0][0] if size_result else 0
-                total_size += table_size_mb
-
-                print(f"{i:<4} {table_name:<40} {record_count:<12,} {table_size_mb:<12.2f}")
-                sample_tables.append((table_name, record_count, table_size_mb))
-
-            except Exception:
+        for i, table_name in enumerate(sample_names, 1):
+            record_count = table_counts.get(table_name)
+            if record_count is None or isinstance(record_count, Exception):
                 print(f"{i:<4} {table_name:<40} {'错误':<12} {'-':<12}")
+                continue
+
+            total_records += record_count
+            table_size_mb = table_sizes.get(table_name, 0)
+            total_size += table_size_mb
+
+            print(f"{i:<4} {table_name:<40} {record_count:<12,} {table_size_mb:<12.2f}")
+            sample_tables.append((table_name, record_count, table_size_mb))
 
         if len(sub_tables) > 10:
             print(f"... 还有 {len(sub_tables) - 10} 个分表")
@@ -584,6 +790,67 @@ class ZQuantDBTool:
         except Exception as e:
             print(f"❌ 删除过程中发生错误: {e}")
 
+    def _delete_tables_chunk(
+        self, table_names: list[str], start_date: str, end_date: str, log_enabled: bool = True
+    ) -> dict[str, dict[str, Any]]:
+        """
+        在一个事务内按时间段删除一批分表的数据，整批只提交一次（用于线程池执行，使用独立会话）
+        批量执行失败时回滚，并退回逐表删除，保证单表错误不影响其他表
+        log_enabled 由调用方在主线程检查日志表后传入，工作线程内不再检查日志表是否存在
+        Returns:
+            Dict[str, Dict[str, Any]]: 表名 -> 操作结果
+        """
+        results: dict[str, dict[str, Any]] = {}
+        params = {"start_date": start_date, "end_date": end_date}
+        start_time = datetime.datetime.now()
+
+        with SessionLocal() as db:
+            try:
+                for table_name in table_names:
+                    date_field = self._get_date_field(table_name, db=db)
+                    if not date_field:
+                        results[table_name] = {
+                            "success": False,
+                            "message": f"表 {table_name} 中未找到日期字段",
+                            "delete_count": 0,
+                        }
+                        continue
+                    delete_sql = f"DELETE FROM `{table_name}` WHERE `{date_field}` BETWEEN :start_date AND :end_date"
+                    result = db.execute(text(delete_sql), params)
+                    results[table_name] = {
+                        "success": True,
+                        "message": f"成功删除表 {table_name} 中指定时间段的数据",
+                        "delete_count": max(result.rowcount, 0),
+                    }
+                db.commit()
+                for table_name in table_names:
+                    self._rowcount_cache.pop(table_name, None)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"批量删除 {len(table_names)} 张分表失败，改为逐表删除: {e}")
+                return {
+                    table_name: self.delete_table_data_by_date_range(table_name, start_date, end_date, db=db)
+                    for table_name in table_names
+                }
+
+            # 只为实际删除了数据的表记录日志，整批一次写入
+            end_time = datetime.datetime.now()
+            log_rows = [
+                self._build_log_data(
+                    table_name=table_name,
+                    operation_type="DELETE_BY_DATE_RANGE",
+                    delete_count=result["delete_count"],
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+                for table_name, result in results.items()
+                if result["success"] and result["delete_count"] > 0
+            ]
+            if log_enabled:
+                self._insert_log_rows(log_rows, db=db, check_table=False)
+
+        return results
+
     def _delete_partition_table_data(self, base_name: str, sub_tables: list[tuple[str, str]]):
         """
         删除分表组的数据
@@ -611,21 +878,55 @@ class ZQuantDBTool:
             success_count = 0
             failed_count = 0
 
-            print("\n开始删除分表组数据...")
-            for i, table_info in enumerate(sub_tables, 1):
-                # sub_tables 包含的是 (table_name, code) 元组，需要提取表名
-                table_name = table_info[0] if isinstance(table_info, tuple) else table_info
-                print(f"进度: {i}/{len(sub_tables)} - 处理表: {table_name}")
-
-                result = self.delete_table_data_by_date_range(table_name, start_date, end_date)
+            # sub_tables 包含的是 (table_name, code) 元组，需要提取表名
+            table_names = [table_info[0] if isinstance(table_info, tuple) else table_info for table_info in sub_tables]
+            total_tables = len(table_names)
+            if total_tables == 0:
+                print("❌ 没有找到子表")
+                return
 
-                if result["success"]:
-                    success_count += 1
-                    total_deleted += result["delete_count"]
-                    print(f"  ✅ 成功删除 {result['delete_count']:,} 条记录")
-                else:
-                    failed_count += 1
-                    print(f"  ❌ 删除失败: {result['message']}")
+            # 一次查询识别全部分表的日期字段，各线程直接读缓存
+            try:
+                self._prefetch_date_fields(table_names)
+            except Exception as e:
+                logger.warning(f"批量识别日期字段失败，改为逐表识别: {e}")
+
+            # 日志表是否存在只在主线程检查一次，结果传给各工作线程
+            log_enabled = self._check_table_exists(self.log_table_name)
+            if not log_enabled:
+                logger.warning(f"日志表 {self.log_table_name} 不存在，跳过日志记录")
+
+            # 每批分表在一个事务内删除、只提交一次；批次数不少于线程数，保证并行度
+            chunk_size = min(DELETE_CHUNK_SIZE, -(-total_tables // DELETE_WORKERS))
+            chunks = [table_names[i : i + chunk_size] for i in range(0, total_tables, chunk_size)]
+            max_workers = min(DELETE_WORKERS, len(chunks))
+            print(f"\n开始删除分表组数据（{len(chunks)} 批，{max_workers} 个线程并行）...")
+            completed = 0
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self._delete_tables_chunk, chunk, start_date, end_date, log_enabled): chunk
+                    for chunk in chunks
+                }
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        chunk_results = {
+                            table_name: {"success": False, "message": str(e), "delete_count": 0} for table_name in chunk
+                        }
+
+                    for table_name in chunk:
+                        result = chunk_results[table_name]
+                        completed += 1
+                        print(f"进度: {completed}/{total_tables} - 完成表: {table_name}")
+                        if result["success"]:
+                            success_count += 1
+                            total_deleted += result["delete_count"]
+                            print(f"  ✅ 成功删除 {result['delete_count']:,} 条记录")
+                        else:
+                            failed_count += 1
+                            print(f"  ❌ 删除失败: {result['message']}")
 
             # 显示总结
             print("\n📊 删除总结:")
@@ -705,6 +1006,8 @@ class ZQuantDBTool:
             # 执行DROP TABLE语句
             sql = f"DROP TABLE `{table_name}`"
             self._execute_sql(sql)
+            self._invalidate_table_list()
+            self._rowcount_cache.pop(table_name, None)
 
             end_time = datetime.datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -749,25 +1052,7 @@ class ZQuantDBTool:
             return
 
         # 分析表结构，识别分表
-        table_groups = {}
-        standalone_tables = []
-
-        for table in tables:
-            # 检查是否为分表（必须以股票代码结尾）
-            if "_" in table and table != self.table_prefix:
-                # 尝试从最后一个下划线分割
-                parts = table.rsplit("_", 1)
-                if len(parts) == 2:
-                    base_name, code = parts
-                    # 验证code是否为有效的股票代码（6位数字）
-                    if code and code.isdigit() and len(code) == 6:
-                        if base_name not in table_groups:
-                            table_groups[base_name] = []
-                        table_groups[base_name].append((table, code))
-                        continue
-
-            # 不是分表，作为独立表
-            standalone_tables.append(table)
+        standalone_tables, table_groups = self._group_tables(tables)
 
         # 构建显示列表
         display_tables = []
@@ -850,14 +1135,17 @@ class ZQuantDBTool:
 
     def _get_table_row_count(self, table_name: str) -> str:
         """
-        获取表的记录数
+        获取表的记录数（ROW_COUNT_CACHE_TTL 秒内复用缓存，避免重复进入菜单时反复全表 COUNT）
         """
+        cached = self._rowcount_cache.get(table_name)
+        if cached is not None and time.time() - cached[0] < ROW_COUNT_CACHE_TTL:
+            return str(cached[1])
         try:
             sql = f"SELECT COUNT(*) FROM `{table_name}`"
             result = self._execute_sql_fetch(sql)
-            if result and len(result) > 0:
-                return str(result[0][0])
-            return "0"
+            row_count = result[0][0] if result else 0
+            self._rowcount_cache[table_name] = (time.time(), row_count)
+            return str(row_count)
         except Exception:
             return "N/A"
 
@@ -962,12 +1250,11 @@ class ZQuantDBTool:
         如果是组合因子，则展开其所有的子因子列
         """
         try:
-            from sqlalchemy import text, inspect as sql_inspect, Double
+            from sqlalchemy import text, Double
             from zquant.factor.calculators.factory import create_calculator
             
             # 检查表是否存在
-            inspector = sql_inspect(engine)
-            if "zq_quant_factor_definitions" not in inspector.get_table_names():
+            if not self._check_table_exists("zq_quant_factor_definitions"):
                 return {}
             
             # 获取所有启用的因子定义
@@ -1190,8 +1477,8 @@ class ZQuantDBTool:
             print(f"提示: 当前前缀 [{self.table_prefix}] 下没有需要管理的分表配置")
             return
 
-        inspector = sql_inspect(engine)
-        all_db_tables = inspector.get_table_names()
+        all_db_tables = sorted(self._get_table_names())
+        inspector = self._inspector
 
         for config in partition_configs:
             print(f"\n--- 正在检查 {config['name']} 分表 ({config['prefix']}) ---")
@@ -1307,6 +1594,7 @@ class ZQuantDBTool:
                         print(f"{'='*60}")
                     
                     if created_count > 0:
+                        self._invalidate_table_list()
                         print(f"\nOK: 成功创建 {created_count} 个分表")
                         
                         # 自动更新相关视图（检测到新增分表后）
@@ -1378,6 +1666,7 @@ class ZQuantDBTool:
                                 deleted_count += 1
                             except Exception as e:
                                 print(f"\n  ERROR: 删除表 {table_name} 失败: {e}")
+                        self._invalidate_table_list()
                         print(f"\nOK: 成功清除 {deleted_count} 个不匹配分表")
                         break
                     else:
@@ -1489,6 +1778,69 @@ class ZQuantDBTool:
         print("分表管理完成")
         print("=" * 60)
 
+    @staticmethod
+    def _build_log_data(
+        table_name: str,
+        operation_type: str,
+        insert_count: int = 0,
+        update_count: int = 0,
+        delete_count: int = 0,
+        operation_result: str = "SUCCESS",
+        error_message: str = "",
+        start_time: datetime.datetime = None,
+        end_time: datetime.datetime = None,
+        created_by: str = "system",
+    ) -> dict[str, Any]:
+        """构建一条操作日志记录（参数同 _log_operation）"""
+        # 计算耗时
+        if start_time and end_time:
+            duration_seconds = round((end_time - start_time).total_seconds(), 2)
+        else:
+            duration_seconds = 0.0
+
+        current_time = datetime.datetime.now()
+        return {
+            "table_name": table_name,
+            "operation_type": operation_type,
+            "insert_count": insert_count,
+            "update_count": update_count,
+            "delete_count": delete_count,
+            "operation_result": operation_result,
+            "error_message": error_message,
+            "start_time": start_time or current_time,
+            "end_time": end_time or current_time,
+            "duration_seconds": duration_seconds,
+            "created_by": created_by,
+            "created_time": current_time,
+        }
+
+    def _insert_log_rows(self, log_rows: list[dict[str, Any]], db=None, check_table: bool = True) -> bool:
+        """
+        批量写入操作日志（一条 INSERT 语句 executemany，只提交一次）
+        check_table 为 False 时跳过日志表存在性检查（调用方已检查过）
+        Returns:
+            bool: 是否记录成功（日志表不存在或写入失败时返回 False，不影响主操作）
+        """
+        if not log_rows:
+            return True
+        try:
+            # 确保日志表存在
+            if check_table and not self._check_table_exists(self.log_table_name):
+                logger.warning(f"日志表 {self.log_table_name} 不存在，跳过日志记录")
+                return False
+
+            # 构建插入SQL
+            columns = list(log_rows[0].keys())
+            placeholders = ", ".join([f":{col}" for col in columns])
+            columns_str = ", ".join([f"`{col}`" for col in columns])
+            insert_sql = f"INSERT INTO `{self.log_table_name}` ({columns_str}) VALUES ({placeholders})"
+
+            self._execute_sql(insert_sql, log_rows, db=db)
+            return True
+        except Exception as e:
+            logger.warning(f"记录日志失败（不影响主操作）: {e}")
+            return False
+
     def _log_operation(
         self,
         table_name: str,
@@ -1501,6 +1853,7 @@ class ZQuantDBTool:
         start_time: datetime.datetime = None,
         end_time: datetime.datetime = None,
         created_by: str = "system",
+        db=None,
     ) -> bool:
         """
         记录操作到日志表
@@ -1516,53 +1869,28 @@ class ZQuantDBTool:
             start_time: 开始时间
             end_time: 结束时间
             created_by: 创建人
+            db: 使用的数据库会话，为空时使用 self.db
 
         Returns:
             bool: 是否记录成功
         """
         try:
-            # 计算耗时
-            if start_time and end_time:
-                duration_seconds = round((end_time - start_time).total_seconds(), 2)
-            else:
-                duration_seconds = 0.0
-
-            # 构建日志数据
-            current_time = datetime.datetime.now()
-            log_data = {
-                "table_name": table_name,
-                "operation_type": operation_type,
-                "insert_count": insert_count,
-                "update_count": update_count,
-                "delete_count": delete_count,
-                "operation_result": operation_result,
-                "error_message": error_message,
-                "start_time": start_time or current_time,
-                "end_time": end_time or current_time,
-                "duration_seconds": duration_seconds,
-                "created_by": created_by,
-                "created_time": current_time,
-            }
-
-            # 保存日志数据（简化实现，直接插入）
-            try:
-                # 确保日志表存在
-                if not self._check_table_exists(self.log_table_name):
-                    logger.warning(f"日志表 {self.log_table_name} 不存在，跳过日志记录")
-                    return False
-
-                # 构建插入SQL
-                columns = list(log_data.keys())
-                placeholders = ", ".join([f":{col}" for col in columns])
-                columns_str = ", ".join([f"`{col}`" for col in columns])
-                insert_sql = f"INSERT INTO `{self.log_table_name}` ({columns_str}) VALUES ({placeholders})"
-
-                self._execute_sql(insert_sql, log_data)
+            log_data = self._build_log_data(
+                table_name=table_name,
+                operation_type=operation_type,
+                insert_count=insert_count,
+                update_count=update_count,
+                delete_count=delete_count,
+                operation_result=operation_result,
+                error_message=error_message,
+                start_time=start_time,
+                end_time=end_time,
+                created_by=created_by,
+            )
+            if self._insert_log_rows([log_data], db=db):
                 logger.debug(f"数据操作日志记录成功: {table_name} - {operation_type}")
                 return True
-            except Exception as e:
-                logger.warning(f"记录日志失败（不影响主操作）: {e}")
-                return False
+            return False
 
         except Exception as e:
             logger.error(f"记录数据操作日志失败: {e}")
@@ -1571,6 +1899,12 @@ class ZQuantDBTool:
 
 def main():
     """主函数 - 命令行入口"""
+    parser = argparse.ArgumentParser(description="数据库操作工具")
+    parser.add_argument("--exact-counts", action="store_true", help="分表详情使用 COUNT(*) 精确统计记录数（较慢）")
+    args = parser.parse_args()
+
+    install_slow_query_log()
+
     # 表类型配置
     table_types = {
         "1": {"prefix": "zq_data_tustock", "name": "zq_data_tustock表"},
@@ -1598,7 +1932,7 @@ def main():
             continue
         
         selected_type = table_types[table_type_choice]
-        tool = ZQuantDBTool(table_prefix=selected_type["prefix"])
+        tool = ZQuantDBTool(table_prefix=selected_type["prefix"], exact_counts=args.exact_counts)
         
         # 进入表操作菜单
         while True:
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 import math
 from pathlib import Path
+import tarfile
 from typing import Any
 
 import joblib
@@ -20,6 +21,7 @@ from zquant.models.data import (
     get_factor_table_name,
     get_spacex_factor_table_name,
 )
+from zquant.utils.stock_features import add_derived_features
 
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -27,16 +29,8 @@ ARTIFACT_DIR = REPO_ROOT / "ml_artifacts"
 
 
 def _feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
-    """特征工程（需与训练脚本一致）"""
-    for window in [5, 10, 20]:
-        df[f"ma_{window}"] = df["close"].rolling(window).mean() / df["close"] - 1
-        df[f"vol_ma_{window}"] = df["vol"].rolling(window).mean() / df["vol"] - 1
-
-    for lag in [1, 2, 3]:
-        df[f"pct_chg_lag_{lag}"] = df["pct_chg"].shift(lag)
-
-    df["dist_boll_upper"] = df["boll_upper"] / df["close"] - 1
-    df["dist_boll_lower"] = df["boll_lower"] / df["close"] - 1
+    """特征工程（衍生特征与训练脚本共用 add_derived_features，按同一精度计算）"""
+    df = add_derived_features(df)
 
     df = df.ffill().bfill()
 
@@ -137,6 +131,29 @@ class LSTMModel(nn.Module):
         return flat_output.view(-1, self.horizon, 3)
 
 
+def _reg_required_paths(base_dir: Path, prefix: str) -> list[Path]:
+    """回归模型的存在性检查路径：优先打包的 {prefix}_reg.tar，否则检查旧版 T+1 的 .pkl"""
+    bundle_path = base_dir / f"{prefix}_reg.tar"
+    if bundle_path.exists():
+        return [bundle_path]
+    return [base_dir / f"{prefix}_reg_{t}_t1.pkl" for t in ("close", "high", "low")]
+
+
+def _load_reg_bundle(bundle_path: Path) -> dict[str, Any]:
+    """从训练脚本打包的 tar（LightGBM 原生文本格式，成员名 reg_{target}_t{day}.txt）加载回归模型"""
+    import lightgbm as lgb
+
+    models: dict[str, Any] = {}
+    with tarfile.open(bundle_path, mode="r") as tar:
+        for member in tar.getmembers():
+            name = member.name
+            if not (name.startswith("reg_") and name.endswith(".txt")):
+                continue
+            model_str = tar.extractfile(member).read().decode("utf-8")
+            models[name[len("reg_"):-len(".txt")]] = lgb.Booster(model_str=model_str)
+    return models
+
+
 def _load_lstm_model(model_path: Path) -> dict:
     """加载LSTM模型"""
     if not model_path.exists():
@@ -160,11 +177,16 @@ def _load_lstm_model(model_path: Path) -> dict:
     y_mean = state["y_mean"]
     y_std = state["y_std"]
     
-    # 兼容旧格式
-    if not isinstance(y_mean, dict):
+    # 兼容旧格式：字典 {"high", "low", "close"} 或单一值，统一为 (3,) 数组
+    if isinstance(y_mean, dict):
+        y_mean = [y_mean["high"], y_mean["low"], y_mean["close"]]
+        y_std = [y_std["high"], y_std["low"], y_std["close"]]
+    elif np.ndim(y_mean) == 0:
         logger.warning("检测到旧格式的标准化参数，将转换为新格式")
-        y_mean = {"high": y_mean, "low": y_mean, "close": y_mean}
-        y_std = {"high": y_std, "low": y_std, "close": y_std}
+        y_mean = [y_mean] * 3
+        y_std = [y_std] * 3
+    y_mean = np.asarray(y_mean, dtype=np.float32)
+    y_std = np.asarray(y_std, dtype=np.float32)
     
     # 重建模型
     input_size = len(feature_cols)
@@ -299,22 +321,19 @@ def _predict_lstm_single(
     if np.isnan(X_norm).any() or np.isinf(X_norm).any():
         X_norm = np.nan_to_num(X_norm, nan=0.0, posinf=1e6, neginf=-1e6)
     
-    X_tensor = torch.tensor(X_norm, dtype=torch.float32).to(device)
+    X_tensor = torch.from_numpy(np.ascontiguousarray(X_norm, dtype=np.float32)).to(device)
     
-    model.eval()
-    with torch.no_grad():
+    # 加载时已切换到推理模式，仅在状态不符时切换
+    if model.training:
+        model.eval()
+    with torch.inference_mode():
         pred_norm = model(X_tensor).cpu().numpy()
     
     if np.isnan(pred_norm).any() or np.isinf(pred_norm).any():
         pred_norm = np.nan_to_num(pred_norm, nan=0.0, posinf=1e6, neginf=-1e6)
     
-    # 反标准化: 分别对H、L、C进行反标准化
-    y_mean = model_config["y_mean"]
-    y_std = model_config["y_std"]
-    pred = np.zeros_like(pred_norm, dtype=np.float32)
-    pred[:, :, 0] = pred_norm[:, :, 0] * y_std["high"] + y_mean["high"]
-    pred[:, :, 1] = pred_norm[:, :, 1] * y_std["low"] + y_mean["low"]
-    pred[:, :, 2] = pred_norm[:, :, 2] * y_std["close"] + y_mean["close"]
+    # 反标准化: H、L、C 的均值/标准差按最后一维广播
+    pred = (pred_norm * model_config["y_std"] + model_config["y_mean"]).astype(np.float32, copy=False)
     
     return pred[0]  # 返回 (horizon, 3) 形状的数组
 
@@ -733,9 +752,7 @@ class ModelEvalService:
             universal_required_root = [
                 ARTIFACT_DIR / "universal_features.pkl",
                 ARTIFACT_DIR / "universal_cls_signal.pkl",
-                ARTIFACT_DIR / "universal_reg_close_t1.pkl",
-                ARTIFACT_DIR / "universal_reg_high_t1.pkl",
-                ARTIFACT_DIR / "universal_reg_low_t1.pkl",
+                *_reg_required_paths(ARTIFACT_DIR, "universal"),
             ]
             if all(p.exists() for p in universal_required_root):
                 return "universal"
@@ -746,9 +763,7 @@ class ModelEvalService:
                 universal_required_sub = [
                     universal_dir / "universal_features.pkl",
                     universal_dir / "universal_cls_signal.pkl",
-                    universal_dir / "universal_reg_close_t1.pkl",
-                    universal_dir / "universal_reg_high_t1.pkl",
-                    universal_dir / "universal_reg_low_t1.pkl",
+                    *_reg_required_paths(universal_dir, "universal"),
                 ]
                 if all(p.exists() for p in universal_required_sub):
                     return "universal"
@@ -765,9 +780,7 @@ class ModelEvalService:
             stock_required_root = [
                 ARTIFACT_DIR / f"{ts_code}_features.pkl",
                 ARTIFACT_DIR / f"{ts_code}_cls_signal.pkl",
-                ARTIFACT_DIR / f"{ts_code}_reg_close_t1.pkl",
-                ARTIFACT_DIR / f"{ts_code}_reg_high_t1.pkl",
-                ARTIFACT_DIR / f"{ts_code}_reg_low_t1.pkl",
+                *_reg_required_paths(ARTIFACT_DIR, ts_code),
             ]
             if all(p.exists() for p in stock_required_root):
                 return ts_code
@@ -784,9 +797,7 @@ class ModelEvalService:
                         stock_required_sub = [
                             subdir / f"{ts_code}_features.pkl",
                             subdir / f"{ts_code}_cls_signal.pkl",
-                            subdir / f"{ts_code}_reg_close_t1.pkl",
-                            subdir / f"{ts_code}_reg_high_t1.pkl",
-                            subdir / f"{ts_code}_reg_low_t1.pkl",
+                            *_reg_required_paths(subdir, ts_code),
                         ]
                         if all(p.exists() for p in stock_required_sub):
                             # 返回子目录名称，这样后续代码会在子目录中查找
@@ -886,6 +897,7 @@ class ModelEvalService:
             # 模型文件在根目录
             features_path = root_features_path
             cls_signal_path = ARTIFACT_DIR / f"{model_id}_cls_signal.pkl"
+            reg_bundle_path = ARTIFACT_DIR / f"{model_id}_reg.tar"
             # 10 日多步回归模型（high/low/close）
             reg_paths: dict[str, Path] = {}
             for d in range(1, 11):
@@ -918,6 +930,9 @@ class ModelEvalService:
                 features_path = model_dir / "features.pkl"
             if not cls_signal_path.exists():
                 cls_signal_path = model_dir / "cls_signal.pkl"
+            reg_bundle_path = model_dir / f"{model_id}_reg.tar"
+            if not reg_bundle_path.exists():
+                reg_bundle_path = model_dir / "reg.tar"
             
             # 10 日多步回归模型（high/low/close）
             reg_paths: dict[str, Path] = {}
@@ -931,19 +946,26 @@ class ModelEvalService:
             # 原有逻辑：在根目录下查找（可能不存在，后续会报错）
             features_path = ARTIFACT_DIR / f"{model_id}_features.pkl"
             cls_signal_path = ARTIFACT_DIR / f"{model_id}_cls_signal.pkl"
+            reg_bundle_path = ARTIFACT_DIR / f"{model_id}_reg.tar"
             # 10 日多步回归模型（high/low/close）
             reg_paths: dict[str, Path] = {}
             for d in range(1, 11):
                 for t in ["close", "high", "low"]:
                     reg_paths[f"{t}_t{d}"] = ARTIFACT_DIR / f"{model_id}_reg_{t}_t{d}.pkl"
 
-        missing = [p for p in [features_path, cls_signal_path, *reg_paths.values()] if not p.exists()]
+        # 优先使用打包的回归模型（LightGBM 原生文本格式），不存在时回退到旧版逐个 .pkl
+        use_reg_bundle = reg_bundle_path.exists()
+        reg_required = [reg_bundle_path] if use_reg_bundle else list(reg_paths.values())
+        missing = [p for p in [features_path, cls_signal_path, *reg_required] if not p.exists()]
         if missing:
             raise FileNotFoundError(f"找不到模型文件，请先训练模型。缺失: {', '.join([str(p) for p in missing])}")
 
         features: list[str] = joblib.load(features_path)
         cls_signal = joblib.load(cls_signal_path)
-        models_reg = {k: joblib.load(v) for k, v in reg_paths.items()}
+        if use_reg_bundle:
+            models_reg = _load_reg_bundle(reg_bundle_path)
+        else:
+            models_reg = {k: joblib.load(v) for k, v in reg_paths.items()}
 
         # 2) 加载最近行情（足够计算滚动特征）
         daily_table = get_daily_table_name(ts_code)
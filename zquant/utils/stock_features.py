@@ -0,0 +1,84 @@
+# Copyright 2025 ZQuant Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: kevin
+# Contact:
+#     - Email: kevin@vip.qq.com
+#     - Wechat: zquant2025
+#     - Issues: https://github.com/yoyoung/zquant/issues
+#     - Documentation: https://github.com/yoyoung/zquant/blob/main/README.md
+#     - Repository: https://github.com/yoyoung/zquant
+
+"""
+股票预测模型的衍生特征
+
+训练脚本、预测脚本和模型评估服务共用，保证训练与推理的衍生特征按同一精度（float32）、
+同一算法计算，避免因精度不同导致特征落在 LightGBM 分箱阈值的两侧。
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import pandas as pd
+
+# 滚动均值窗口与涨跌幅滞后阶数
+ROLL_WINDOWS = (5, 10, 20)
+LAGS = (1, 2, 3)
+
+
+def _rolling_mean(arr: np.ndarray, window: int) -> np.ndarray:
+    """等长滚动均值：前 window-1 个位置为 NaN，窗口内含 NaN 时结果为 NaN（与 pandas rolling 一致）"""
+    out = np.full(len(arr), np.nan, dtype=arr.dtype)
+    if len(arr) >= window:
+        out[window - 1 :] = sliding_window_view(arr, window).mean(axis=1)
+    return out
+
+
+def _shift(arr: np.ndarray, lag: int) -> np.ndarray:
+    """向后平移 lag 位，开头补 NaN（等价于 Series.shift(lag)）"""
+    out = np.full(len(arr), np.nan, dtype=arr.dtype)
+    out[lag:] = arr[: len(arr) - lag]
+    return out
+
+
+def add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    添加均线偏离、成交量均线偏离、涨跌幅滞后和布林带距离等衍生特征（按 float32 计算）
+
+    Args:
+        df: 按交易日升序的单只股票数据，需包含 close、vol、pct_chg、boll_upper、boll_lower 列
+
+    Returns:
+        添加衍生列后的新 DataFrame（原列不变）
+    """
+    close = df["close"].to_numpy(dtype=np.float32, na_value=np.nan)
+    vol = df["vol"].to_numpy(dtype=np.float32, na_value=np.nan)
+    pct_chg = df["pct_chg"].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    # 直接在 NumPy 数组上计算，全部衍生列一次性加入，避免逐列插入
+    new_cols = {}
+    # 成交量/收盘价为 0 时结果为 inf（与 pandas 运算一致），不提示除零警告
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 1. 价格动量特征
+        for window in ROLL_WINDOWS:
+            new_cols[f"ma_{window}"] = _rolling_mean(close, window) / close - 1
+            new_cols[f"vol_ma_{window}"] = _rolling_mean(vol, window) / vol - 1
+
+        # 2. 滞后特征
+        for lag in LAGS:
+            new_cols[f"pct_chg_lag_{lag}"] = _shift(pct_chg, lag)
+
+        # 3. 趋势特征
+        new_cols["dist_boll_upper"] = df["boll_upper"].to_numpy(dtype=np.float32, na_value=np.nan) / close - 1
+        new_cols["dist_boll_lower"] = df["boll_lower"].to_numpy(dtype=np.float32, na_value=np.nan) / close - 1
+    return df.assign(**new_cols)